@@ -11,9 +11,8 @@ if str(_dashboard_dir) not in sys.path:
     sys.path.insert(0, str(_dashboard_dir))
 
 import streamlit as st
-import pandas as pd
+import plotly.express as px
 from datetime import datetime
-import time
 
 from components.kpi_cards import render_kpi_cards
 from components.delay_heatmap import render_delay_heatmap
@@ -88,6 +87,13 @@ with st.sidebar:
         index=3
     )
     
+    # Map detail toggle (dense maps are thinned to ~50 m grid cells by default)
+    full_map_detail = st.checkbox(
+        "Show every vehicle on map",
+        value=False,
+        help="Disable grid sampling of the live map when more than 2000 vehicles are reporting"
+    )
+    
     st.divider()
     
     # About section
@@ -108,114 +114,116 @@ with st.sidebar:
     st.caption("Update Frequency: Every 30 seconds")
     st.caption("Built with Streamlit | AWS | Python")
 
-# Load data (without spinner to avoid screen darkening)
-data = load_dashboard_data()
-vehicles_df = data['vehicles']
-trip_updates_df = data['trip_updates']
-data_source = data.get('data_source', 'live')
-
-# Show banner when using mock data (e.g. Streamlit Cloud without Secrets)
-if data_source == 'mock':
-    st.warning(
-        "**Using sample data.** To see live Edmonton Transit data, add AWS credentials in Streamlit Cloud: "
-        "app **Settings** → **Secrets** → paste your `AWS_ACCESS_KEY_ID`, `AWS_SECRET_ACCESS_KEY`, "
-        "`AWS_REGION` (us-east-2), and `DYNAMODB_TABLE_NAME` (ets_transit_processed)."
-    )
-
-# Last refreshed timestamp with countdown
-current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-st.markdown(f'<div class="last-updated">Last Refreshed: {current_time} • Auto-refresh in 30s</div>', unsafe_allow_html=True)
 
-# Apply filters
-if selected_routes:
-    if not vehicles_df.empty:
-        vehicles_df = vehicles_df[vehicles_df['route_id'].isin(selected_routes)]
-    if not trip_updates_df.empty:
-        trip_updates_df = trip_updates_df[trip_updates_df['route_id'].isin(selected_routes)]
+# Data-driven sections run inside a fragment so the auto-refresh only reruns
+# this subtree instead of the whole script (header, CSS, sidebar)
+@st.fragment(run_every=30 if auto_refresh else None)
+def render_live_panel():
+    """Load the latest data and render all data-driven dashboard sections."""
+    # Load data (without spinner to avoid screen darkening)
+    data = load_dashboard_data()
+    vehicles_df = data['vehicles']
+    trip_updates_df = data['trip_updates']
+    data_source = data.get('data_source', 'live')
+
+    # Show banner when using mock data (e.g. Streamlit Cloud without Secrets)
+    if data_source == 'mock':
+        st.warning(
+            "**Using sample data.** To see live Edmonton Transit data, add AWS credentials in Streamlit Cloud: "
+            "app **Settings** → **Secrets** → paste your `AWS_ACCESS_KEY_ID`, `AWS_SECRET_ACCESS_KEY`, "
+            "`AWS_REGION` (us-east-2), and `DYNAMODB_TABLE_NAME` (ets_transit_processed)."
+        )
+
+    # Last refreshed timestamp with countdown
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    st.markdown(f'<div class="last-updated">Last Refreshed: {current_time} • Auto-refresh in 30s</div>', unsafe_allow_html=True)
+
+    # Apply filters
+    if selected_routes:
+        if not vehicles_df.empty:
+            vehicles_df = vehicles_df[vehicles_df['route_id'].isin(selected_routes)]
+        if not trip_updates_df.empty:
+            trip_updates_df = trip_updates_df[trip_updates_df['route_id'].isin(selected_routes)]
+
+    # KPI Cards
+    render_kpi_cards(vehicles_df, trip_updates_df)
 
-# KPI Cards
-render_kpi_cards(vehicles_df, trip_updates_df)
-
-st.divider()
+    st.divider()
 
-# Main content area - two columns
-col1, col2 = st.columns([2, 1])
+    # Main content area - two columns
+    col1, col2 = st.columns([2, 1])
 
-with col1:
-    # Live Map
-    render_live_map(vehicles_df, trip_updates_df)
+    with col1:
+        # Live Map
+        render_live_map(vehicles_df, trip_updates_df, max_points=None if full_map_detail else 2000)
 
-with col2:
-    # Route Performance
-    render_route_performance(trip_updates_df, top_n=10)
+    with col2:
+        # Route Performance
+        render_route_performance(trip_updates_df, top_n=10)
 
-st.divider()
+    st.divider()
 
-# Delay Heatmap (full width)
-render_delay_heatmap(trip_updates_df)
+    # Delay Heatmap (full width)
+    render_delay_heatmap(trip_updates_df)
 
-st.divider()
+    st.divider()
 
-# Additional insights
-with st.expander("📈 Additional Analytics"):
-    tab1, tab2, tab3 = st.tabs(["Delay Distribution", "Hourly Trends", "Raw Data"])
-    
-    with tab1:
-        if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
-            st.subheader("Delay Distribution")
-            import plotly.express as px
-            
-            fig = px.histogram(
-                trip_updates_df,
-                x='delay_minutes',
-                nbins=50,
-                title="Distribution of Delays",
-                labels={'delay_minutes': 'Delay (minutes)', 'count': 'Frequency'}
-            )
-            st.plotly_chart(fig, width='stretch')
-        else:
-            st.info("No delay data available")
-    
-    with tab2:
-        if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
-            st.subheader("Hourly Delay Trends")
-            
-            # Extract hour if not present
-            if 'hour' not in trip_updates_df.columns:
-                trip_updates_df['hour'] = pd.to_datetime(trip_updates_df['feed_timestamp']).dt.hour
-            
-            hourly_avg = trip_updates_df.groupby('hour')['delay_minutes'].mean().reset_index()
-            
-            import plotly.express as px
-            fig = px.line(
-                hourly_avg,
-                x='hour',
-                y='delay_minutes',
-                title="Average Delay by Hour of Day",
-                labels={'hour': 'Hour of Day', 'delay_minutes': 'Avg Delay (min)'},
-                markers=True
-            )
-            st.plotly_chart(fig, width='stretch')
-        else:
-            st.info("No delay data available")
-    
-    with tab3:
-        st.subheader("Raw Data Preview")
+    # Additional insights (only built when toggled on, so refreshes skip the extra figures)
+    if st.toggle("📈 Additional Analytics", key='show_additional_analytics'):
+        tab1, tab2, tab3 = st.tabs(["Delay Distribution", "Hourly Trends", "Raw Data"])
         
-        data_choice = st.radio("Select data type:", ["Vehicle Positions", "Trip Updates"])
+        with tab1:
+            if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
+                st.subheader("Delay Distribution")
+                fig = px.histogram(
+                    trip_updates_df,
+                    x='delay_minutes',
+                    nbins=50,
+                    title="Distribution of Delays",
+                    labels={'delay_minutes': 'Delay (minutes)', 'count': 'Frequency'}
+                )
+                st.plotly_chart(fig, width='stretch')
+            else:
+                st.info("No delay data available")
         
-        if data_choice == "Vehicle Positions":
-            if not vehicles_df.empty:
-                st.dataframe(vehicles_df.head(100), width='stretch')
-                st.caption(f"Showing first 100 of {len(vehicles_df)} records")
+        with tab2:
+            if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
+                st.subheader("Hourly Delay Trends")
+                
+                hourly_avg = trip_updates_df.groupby('hour')['delay_minutes'].mean().reset_index()
+                
+                fig = px.line(
+                    hourly_avg,
+                    x='hour',
+                    y='delay_minutes',
+                    title="Average Delay by Hour of Day",
+                    labels={'hour': 'Hour of Day', 'delay_minutes': 'Avg Delay (min)'},
+                    markers=True
+                )
+                st.plotly_chart(fig, width='stretch')
             else:
-                st.info("No vehicle data available")
-        else:
-            if not trip_updates_df.empty:
-                st.dataframe(trip_updates_df.head(100), width='stretch')
-                st.caption(f"Showing first 100 of {len(trip_updates_df)} records")
+                st.info("No delay data available")
+        
+        with tab3:
+            st.subheader("Raw Data Preview")
+            
+            data_choice = st.radio("Select data type:", ["Vehicle Positions", "Trip Updates"])
+            
+            if data_choice == "Vehicle Positions":
+                if not vehicles_df.empty:
+                    st.dataframe(vehicles_df.head(100), width='stretch')
+                    st.caption(f"Showing first 100 of {len(vehicles_df)} records")
+                else:
+                    st.info("No vehicle data available")
             else:
-                st.info("No trip update data available")
+                if not trip_updates_df.empty:
+                    st.dataframe(trip_updates_df.head(100), width='stretch')
+                    st.caption(f"Showing first 100 of {len(trip_updates_df)} records")
+                else:
+                    st.info("No trip update data available")
+
+
+render_live_panel()
 
 # Footer
 st.divider()
@@ -225,8 +233,3 @@ st.markdown("""
     <p>Data Engineering | Machine Learning | Data Visualization</p>
 </div>
 """, unsafe_allow_html=True)
-
-# Auto-refresh logic
-if auto_refresh:
-    time.sleep(30)
-    st.rerun()
@@ -4,8 +4,77 @@ Shows density heatmap of delays by route and hour.
 """
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Tuple
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _route_hour_delay(fingerprint: tuple, _trip_updates_df: pd.DataFrame, route_col: str) -> Tuple[pd.Index, np.ndarray]:
+    """
+    Average delay by route and hour, cached across reruns.
+    
+    Sums and counts are accumulated per (route, hour) cell with np.bincount,
+    which produces the heatmap matrix directly without a groupby.
+    
+    Args:
+        fingerprint: (row count, content hash of the used columns, route_col)
+            key so Streamlit doesn't hash the full DataFrame
+        _trip_updates_df: DataFrame with trip updates (not hashed)
+        route_col: Column to use as the route identifier
+        
+    Returns:
+        Tuple of (sorted routes, float32 matrix of shape (n_routes, 24) with
+        NaN where a route has no data for that hour)
+    """
+    route_codes, routes = pd.factorize(_trip_updates_df[route_col], sort=True)
+    hours = _trip_updates_df['hour'].to_numpy()
+    delays = _trip_updates_df['delay_minutes'].to_numpy(dtype=float, na_value=np.nan)
+    
+    valid = (route_codes >= 0) & ~np.isnan(delays)
+    cells = route_codes[valid] * 24 + hours[valid]
+    n_cells = len(routes) * 24
+    
+    sums = np.bincount(cells, weights=delays[valid], minlength=n_cells)
+    counts = np.bincount(cells, minlength=n_cells)
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    
+    return routes, means.reshape(len(routes), 24).astype(np.float32)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _heatmap_json(fingerprint: tuple, _routes: pd.Index, _delay_matrix: np.ndarray) -> str:
+    """
+    Build the route/hour heatmap figure once per fingerprint and cache its JSON.
+    
+    Args:
+        fingerprint: Same key used for _route_hour_delay
+        _routes: Route labels for the y axis (not hashed)
+        _delay_matrix: Matrix from _route_hour_delay (not hashed)
+        
+    Returns:
+        Plotly figure serialized as JSON
+    """
+    fig = go.Figure(data=go.Heatmap(
+        z=_delay_matrix,
+        x=np.arange(24),
+        y=_routes,
+        colorscale='RdYlGn_r',  # Red for high delays, green for low
+        colorbar=dict(title="Delay (min)"),
+        hovertemplate='Route: %{y}<br>Hour: %{x}:00<br>Avg Delay: %{z:.2f} min<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title="Average Delay by Route and Hour of Day",
+        xaxis_title="Hour of Day",
+        yaxis_title="Route",
+        height=400,
+        xaxis=dict(dtick=1)
+    )
+    
+    return fig.to_json()
 
 
 def render_delay_heatmap(trip_updates_df: pd.DataFrame):
@@ -23,9 +92,12 @@ def render_delay_heatmap(trip_updates_df: pd.DataFrame):
     
     st.caption(f"Analyzing {len(trip_updates_df)} trip updates")
     
-    # Extract hour if not already present
+    # Hour is precomputed by the data loader; otherwise derive it on a new frame
+    # rather than writing into a possibly filtered caller's DataFrame
     if 'hour' not in trip_updates_df.columns:
-        trip_updates_df['hour'] = pd.to_datetime(trip_updates_df['feed_timestamp']).dt.hour
+        trip_updates_df = trip_updates_df.assign(
+            hour=pd.to_datetime(trip_updates_df['feed_timestamp'], cache=True).dt.hour.astype('int8')
+        )
     
     # Get route name for display
     if 'route_short_name' in trip_updates_df.columns:
@@ -33,41 +105,41 @@ def render_delay_heatmap(trip_updates_df: pd.DataFrame):
     else:
         route_col = 'route_id'
     
-    # Calculate average delay by route and hour
-    heatmap_data = trip_updates_df.groupby([route_col, 'hour'])['delay_minutes'].mean().reset_index()
-    
-    # Pivot for heatmap format
-    heatmap_pivot = heatmap_data.pivot(index=route_col, columns='hour', values='delay_minutes')
-    
-    # Create heatmap
-    fig = go.Figure(data=go.Heatmap(
-        z=heatmap_pivot.values,
-        x=heatmap_pivot.columns,
-        y=heatmap_pivot.index,
-        colorscale='RdYlGn_r',  # Red for high delays, green for low
-        colorbar=dict(title="Delay (min)"),
-        hovertemplate='Route: %{y}<br>Hour: %{x}:00<br>Avg Delay: %{z:.2f} min<extra></extra>'
-    ))
+    # Calculate average delay by route and hour, cached on a hash of just the
+    # columns it reads so differently filtered frames never share an entry
+    content_hash = pd.util.hash_pandas_object(
+        trip_updates_df[[route_col, 'hour', 'delay_minutes']], index=False
+    ).sum()
+    fingerprint = (len(trip_updates_df), int(content_hash), route_col)
+    routes, delay_matrix = _route_hour_delay(fingerprint, trip_updates_df, route_col)
     
-    fig.update_layout(
-        title="Average Delay by Route and Hour of Day",
-        xaxis_title="Hour of Day",
-        yaxis_title="Route",
-        height=400,
-        xaxis=dict(dtick=1)
-    )
+    # Figure JSON is cached on the same fingerprint as the matrix
+    fig = pio.from_json(_heatmap_json(fingerprint, routes, delay_matrix))
     
     st.plotly_chart(fig, width='stretch')
     
     # Summary insights
     with st.expander("📊 Heatmap Insights"):
+        # Average the observed (non-NaN) cells along each axis of the matrix
+        observed = ~np.isnan(delay_matrix)
+        with np.errstate(invalid='ignore'):
+            hourly_delay = np.nansum(delay_matrix, axis=0) / observed.sum(axis=0)
+            route_delay = np.nansum(delay_matrix, axis=1) / observed.sum(axis=1)
+        
+        # nanargmax raises on all-NaN input, e.g. when every delay is null
+        if not np.isfinite(hourly_delay).any():
+            st.info("No delay values available for insights")
+            return
+        
         # Most delayed hour
-        most_delayed_hour = heatmap_data.groupby('hour')['delay_minutes'].mean().idxmax()
-        avg_delay_at_peak = heatmap_data.groupby('hour')['delay_minutes'].mean().max()
+        peak_hour_idx = np.nanargmax(hourly_delay)
+        most_delayed_hour = int(peak_hour_idx)
+        avg_delay_at_peak = hourly_delay[peak_hour_idx]
         
         # Most delayed route
-        most_delayed_route = heatmap_data.groupby(route_col)['delay_minutes'].mean().idxmax()
-        route_avg_delay = heatmap_data.groupby(route_col)['delay_minutes'].mean().max()
+        peak_route_idx = np.nanargmax(route_delay)
+        most_delayed_route = routes[peak_route_idx]
+        route_avg_delay = route_delay[peak_route_idx]
         
         col1, col2 = st.columns(2)
         
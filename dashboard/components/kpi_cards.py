@@ -4,6 +4,7 @@ Displays Active Buses, Average Delay, and On-Time Rate.
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 
 
 def render_kpi_cards(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame):
@@ -16,9 +17,17 @@ def render_kpi_cards(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame):
     """
     col1, col2, col3 = st.columns(3)
     
+    # Delay metrics for KPIs 2 and 3, computed once from the raw delay array
+    has_delays = not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns
+    if has_delays:
+        delays = trip_updates_df['delay_minutes'].to_numpy(dtype=float, na_value=np.nan)
+        avg_delay = float(np.nanmean(delays))
+        on_time_count = int(np.count_nonzero(np.abs(delays) <= 5))
+        total_count = delays.size
+    
     # KPI 1: Active Buses
     with col1:
-        active_buses = len(vehicles_df['vehicle_id'].unique()) if not vehicles_df.empty else 0
+        active_buses = int(vehicles_df['vehicle_id'].nunique()) if not vehicles_df.empty else 0
         st.metric(
             label="🚌 Active Buses",
             value=active_buses,
@@ -27,9 +36,7 @@ def render_kpi_cards(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame):
     
     # KPI 2: Average Delay
     with col2:
-        if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
-            avg_delay = trip_updates_df['delay_minutes'].mean()
-            
+        if has_delays:
             # Determine delta color (negative is good for delays)
             delta_color = "normal" if avg_delay <= 3 else "inverse"
             
@@ -49,10 +56,8 @@ def render_kpi_cards(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame):
     
     # KPI 3: On-Time Rate
     with col3:
-        if not trip_updates_df.empty and 'delay_minutes' in trip_updates_df.columns:
+        if has_delays:
             # On-time = within 5 minutes of schedule
-            on_time_count = (trip_updates_df['delay_minutes'].abs() <= 5).sum()
-            total_count = len(trip_updates_df)
             on_time_rate = (on_time_count / total_count * 100) if total_count > 0 else 0
             
             # Determine delta (higher is better)
@@ -4,17 +4,53 @@ Shows vehicle positions with color coding by delay severity.
 """
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
 import numpy as np
+from typing import Optional
 
 
-def render_live_map(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame = None):
+# RGBA colors per delay status: on-time, slight delay, delayed, unknown
+STATUS_COLORS = np.array([
+    [0, 200, 0, 200],
+    [255, 200, 0, 200],
+    [255, 0, 0, 200],
+    [128, 128, 128, 200]
+], dtype=np.uint8)
+
+# Upper bounds (minutes, inclusive) for on-time and slight delay
+STATUS_BOUNDS = [2, 5]
+
+# Grid cells per degree used to thin dense maps (1/2000 deg is roughly 50 m)
+DOWNSAMPLE_GRID_PER_DEGREE = 2000
+
+
+def classify_delays(delays: np.ndarray) -> np.ndarray:
+    """
+    Classify delays into status codes in a single pass.
+    
+    Args:
+        delays: Array of delay_minutes (NaN for unknown)
+        
+    Returns:
+        uint8 array of codes: 0 on-time, 1 slight delay, 2 delayed, 3 unknown
+    """
+    codes = np.digitize(delays, STATUS_BOUNDS, right=True).astype(np.uint8)
+    codes[np.isnan(delays)] = 3
+    return codes
+
+
+def render_live_map(
+    vehicles_df: pd.DataFrame,
+    trip_updates_df: pd.DataFrame = None,
+    max_points: Optional[int] = 2000
+):
     """
     Render live vehicle positions map.
     
     Args:
         vehicles_df: DataFrame with vehicle positions
         trip_updates_df: Optional DataFrame with delays for color coding
+        max_points: Above this many vehicles, keep one marker per ~50 m grid
+            cell; None always draws every vehicle
     """
     st.subheader("🗺️ Live Vehicle Positions")
     
@@ -27,13 +63,12 @@ def render_live_map(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame = N
         st.error("Missing latitude/longitude data")
         return
     
-    # Remove invalid coordinates
-    vehicles_df = vehicles_df[
-        (vehicles_df['latitude'].notna()) &
-        (vehicles_df['longitude'].notna()) &
-        (vehicles_df['latitude'] != 0) &
-        (vehicles_df['longitude'] != 0)
-    ]
+    # Remove invalid coordinates with a single mask (NaN fails x == x)
+    lat = pd.to_numeric(vehicles_df['latitude'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    lon = pd.to_numeric(vehicles_df['longitude'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = (lat == lat) & (lon == lon) & (lat != 0) & (lon != 0)
+    vehicles_df = vehicles_df[valid]
+    lat, lon = lat[valid], lon[valid]
     
     if vehicles_df.empty:
         st.info("No valid vehicle positions to display")
@@ -43,27 +78,41 @@ def render_live_map(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame = N
     if trip_updates_df is not None and not trip_updates_df.empty:
         # Get latest delay per vehicle
         if 'vehicle_id' in trip_updates_df.columns and 'delay_minutes' in trip_updates_df.columns:
-            latest_delays = trip_updates_df.sort_values('feed_timestamp').groupby('vehicle_id').last()
-            vehicles_df = vehicles_df.merge(
-                latest_delays[['delay_minutes']],
-                left_on='vehicle_id',
-                right_index=True,
-                how='left'
+            latest_idx = trip_updates_df.groupby('vehicle_id', sort=False, observed=True)['feed_timestamp'].idxmax()
+            delay_by_vehicle = dict(zip(latest_idx.index, trip_updates_df['delay_minutes'].loc[latest_idx].to_numpy()))
+            vehicles_df = vehicles_df.assign(
+                delay_minutes=vehicles_df['vehicle_id'].map(delay_by_vehicle).astype(float)
             )
     
-    # Prepare map data with proper types
-    map_df = vehicles_df[['latitude', 'longitude']].copy()
+    # Classify every vehicle by delay status (summary counts use the full set)
+    if 'delay_minutes' in vehicles_df.columns:
+        status_codes = classify_delays(vehicles_df['delay_minutes'].to_numpy(dtype=float, na_value=np.nan))
+    else:
+        status_codes = np.full(len(vehicles_df), 3, dtype=np.uint8)
     
-    # Ensure numeric types
-    map_df['latitude'] = pd.to_numeric(map_df['latitude'], errors='coerce')
-    map_df['longitude'] = pd.to_numeric(map_df['longitude'], errors='coerce')
+    # Thin overplotted markers to one per grid cell when the map is dense
+    shown = np.ones(len(vehicles_df), dtype=bool)
+    if max_points is not None and len(vehicles_df) > max_points:
+        grid_cells = pd.DataFrame({
+            'lat_bin': np.floor(lat * DOWNSAMPLE_GRID_PER_DEGREE).astype(np.int64),
+            'lon_bin': np.floor(lon * DOWNSAMPLE_GRID_PER_DEGREE).astype(np.int64)
+        })
+        shown = ~grid_cells.duplicated().to_numpy()
     
-    # Add size for visualization
-    map_df['size'] = 50
+    # Prepare map data; colors come from a palette lookup on the status codes
+    map_df = pd.DataFrame({
+        'latitude': lat[shown],
+        'longitude': lon[shown],
+        'size': 50,
+        'color': STATUS_COLORS[status_codes[shown]].tolist()
+    })
     
     # Display using Streamlit's built-in map (simpler, more reliable)
-    st.caption(f"Displaying {len(map_df)} vehicles on map")
-    st.map(map_df, size='size', zoom=11)
+    if len(map_df) < len(vehicles_df):
+        st.caption(f"Displaying a sampled subset of {len(map_df)} of {len(vehicles_df)} vehicles on map")
+    else:
+        st.caption(f"Displaying {len(map_df)} vehicles on map")
+    st.map(map_df, size='size', color='color', zoom=11)
     
     # Legend
     col1, col2, col3, col4 = st.columns(4)
@@ -80,10 +129,7 @@ def render_live_map(vehicles_df: pd.DataFrame, trip_updates_df: pd.DataFrame = N
     # Vehicle count by status
     if 'delay_minutes' in vehicles_df.columns:
         with st.expander("🚦 Vehicle Status Summary"):
-            on_time = len(vehicles_df[vehicles_df['delay_minutes'] <= 2])
-            slight_delay = len(vehicles_df[(vehicles_df['delay_minutes'] > 2) & (vehicles_df['delay_minutes'] <= 5)])
-            delayed = len(vehicles_df[vehicles_df['delay_minutes'] > 5])
-            unknown = len(vehicles_df[vehicles_df['delay_minutes'].isna()])
+            on_time, slight_delay, delayed, unknown = np.bincount(status_codes, minlength=4).tolist()
             
             col1, col2, col3, col4 = st.columns(4)
             col1.metric("On-Time", on_time)
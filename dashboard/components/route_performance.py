@@ -5,6 +5,40 @@ Shows average delay per route, sorted descending.
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.io as pio
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _route_bar_json(route_stats: pd.DataFrame, route_col: str) -> str:
+    """
+    Build the route performance bar chart and cache its JSON.
+    
+    Args:
+        route_stats: Top-N route statistics (small, so hashing it is cheap)
+        route_col: Column holding the route identifier
+        
+    Returns:
+        Plotly figure serialized as JSON
+    """
+    fig = px.bar(
+        route_stats,
+        x='avg_delay',
+        y=route_col,
+        orientation='h',
+        color='avg_delay',
+        color_continuous_scale='RdYlGn_r',  # Red for high delays
+        labels={'avg_delay': 'Average Delay (min)', route_col: 'Route'},
+        hover_data={'num_updates': True, 'route_name': True},
+        title=f"Top {len(route_stats)} Routes by Average Delay"
+    )
+    
+    fig.update_layout(
+        height=max(400, len(route_stats) * 30),
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}  # Sort bars by value
+    )
+    
+    return fig.to_json()
 
 
 def render_route_performance(trip_updates_df: pd.DataFrame, top_n: int = 15):
@@ -29,17 +63,17 @@ def render_route_performance(trip_updates_df: pd.DataFrame, top_n: int = 15):
         route_col = 'route_id'
         route_name_col = 'route_id'
     
-    # Calculate statistics by route
-    route_stats = trip_updates_df.groupby(route_col).agg({
-        'delay_minutes': ['mean', 'count'],
-        route_name_col: 'first'
-    }).reset_index()
+    # Keep only routes with sufficient data (at least 5 non-null delays) before aggregating
+    update_counts = trip_updates_df.loc[trip_updates_df['delay_minutes'].notna(), route_col].value_counts()
+    update_counts = update_counts[update_counts >= 5]
+    trip_updates_df = trip_updates_df[trip_updates_df[route_col].isin(update_counts.index)]
     
-    # Flatten column names
-    route_stats.columns = [route_col, 'avg_delay', 'num_updates', 'route_name']
-    
-    # Filter routes with sufficient data (at least 5 updates)
-    route_stats = route_stats[route_stats['num_updates'] >= 5]
+    # Calculate statistics by route (single-column aggregations, no MultiIndex to flatten)
+    grouped = trip_updates_df.groupby(route_col, observed=True, sort=False)
+    route_stats = grouped['delay_minutes'].mean().to_frame('avg_delay')
+    route_stats['num_updates'] = update_counts
+    route_stats['route_name'] = grouped[route_name_col].first()
+    route_stats = route_stats.reset_index()
     
     # Sort by average delay descending and take top N
     route_stats = route_stats.sort_values('avg_delay', ascending=False).head(top_n)
@@ -48,24 +82,8 @@ def render_route_performance(trip_updates_df: pd.DataFrame, top_n: int = 15):
         st.info("Insufficient data for route performance analysis")
         return
     
-    # Create bar chart
-    fig = px.bar(
-        route_stats,
-        x='avg_delay',
-        y=route_col,
-        orientation='h',
-        color='avg_delay',
-        color_continuous_scale='RdYlGn_r',  # Red for high delays
-        labels={'avg_delay': 'Average Delay (min)', route_col: 'Route'},
-        hover_data={'num_updates': True, 'route_name': True},
-        title=f"Top {len(route_stats)} Routes by Average Delay"
-    )
-    
-    fig.update_layout(
-        height=max(400, len(route_stats) * 30),
-        showlegend=False,
-        yaxis={'categoryorder': 'total ascending'}  # Sort bars by value
-    )
+    # Figure JSON is cached on the (small) top-N stats frame
+    fig = pio.from_json(_route_bar_json(route_stats, route_col))
     
     st.plotly_chart(fig, width='stretch')
     
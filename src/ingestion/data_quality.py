@@ -2,9 +2,56 @@
 Data quality validation for GTFS-RT records.
 Implements null checks, schema validation, and deduplication.
 """
-from typing import List, Dict, Set
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Dict
 from datetime import datetime
 
+# Optional: pandas for vectorized batch validation (not in the slim Lambda package)
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+
+# Maximum number of dedup keys remembered per record type
+MAX_DEDUP_KEYS = 200_000
+
+
+class BoundedKeySet:
+    """Set of dedup keys that evicts the oldest keys beyond a maximum size."""
+    
+    def __init__(self, maxsize: int = MAX_DEDUP_KEYS):
+        """
+        Initialize the key set.
+        
+        Args:
+            maxsize: Number of keys kept before the oldest are evicted
+        """
+        self.maxsize = maxsize
+        self._keys: OrderedDict = OrderedDict()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, key: Hashable):
+        """Add a key, evicting the oldest one if the set is full."""
+        self._keys[key] = None
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+    
+    def update(self, keys: Iterable[Hashable]):
+        """Add several keys."""
+        for key in keys:
+            self.add(key)
+    
+    def clear(self):
+        """Remove all keys."""
+        self._keys.clear()
+
 
 class DataQualityValidator:
     """Validator for GTFS-RT data quality."""
@@ -17,8 +64,11 @@ class DataQualityValidator:
     
     def __init__(self):
         """Initialize the validator."""
-        self.seen_vehicles: Set[str] = set()
-        self.seen_trip_updates: Set[str] = set()
+        self._vehicle_required = tuple(self.VEHICLE_REQUIRED_FIELDS)
+        self._trip_update_required = tuple(self.TRIP_UPDATE_REQUIRED_FIELDS)
+        # Bounded so long-lived (warm) processes don't grow without limit
+        self.seen_vehicles = BoundedKeySet()
+        self.seen_trip_updates = BoundedKeySet()
         self.stats = {
             'vehicles_processed': 0,
             'vehicles_valid': 0,
@@ -40,27 +90,15 @@ class DataQualityValidator:
         Returns:
             True if valid, False otherwise
         """
-        # Check required fields
-        for field in self.VEHICLE_REQUIRED_FIELDS:
-            if field not in record or record[field] is None:
-                return False
-        
-        # Validate latitude/longitude ranges
-        lat = record.get('latitude')
-        lon = record.get('longitude')
-        
-        if lat is not None and (lat < -90 or lat > 90):
+        # Check required fields, then lat/lon ranges and non-negative speed (if present)
+        if not all(record.get(field) is not None for field in self._vehicle_required):
             return False
         
-        if lon is not None and (lon < -180 or lon > 180):
-            return False
-        
-        # Validate speed (if present, should be non-negative)
+        lat = record['latitude']
+        lon = record['longitude']
         speed = record.get('speed')
-        if speed is not None and speed < 0:
-            return False
         
-        return True
+        return -90 <= lat <= 90 and -180 <= lon <= 180 and (speed is None or speed >= 0)
     
     def validate_trip_update(self, record: Dict) -> bool:
         """
@@ -73,11 +111,48 @@ class DataQualityValidator:
             True if valid, False otherwise
         """
         # Check required fields
-        for field in self.TRIP_UPDATE_REQUIRED_FIELDS:
-            if field not in record or record[field] is None:
-                return False
+        return all(record.get(field) is not None for field in self._trip_update_required)
+    
+    def validate_vehicle_positions_batch(self, df: 'pd.DataFrame') -> 'pd.Series':
+        """
+        Validate a DataFrame of vehicle positions in one vectorized pass.
+        
+        Applies the same checks as validate_vehicle_position to whole columns.
         
-        return True
+        Args:
+            df: Vehicle positions, one row per record
+            
+        Returns:
+            Boolean Series (aligned to df) marking valid rows
+        """
+        if not set(self._vehicle_required).issubset(df.columns):
+            return pd.Series(False, index=df.index)
+        
+        lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=float)
+        lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=float)
+        
+        # NaN fails every comparison, so missing coordinates are invalid too
+        valid = df[list(self._vehicle_required)].notna().all(axis=1).to_numpy(copy=True)
+        valid &= (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180)
+        if 'speed' in df.columns:
+            speed = pd.to_numeric(df['speed'], errors='coerce').to_numpy(dtype=float)
+            valid &= ~(speed < 0)
+        
+        return pd.Series(valid, index=df.index)
+    
+    def validate_trip_updates_batch(self, df: 'pd.DataFrame') -> 'pd.Series':
+        """
+        Validate a DataFrame of trip updates in one vectorized pass.
+        
+        Args:
+            df: Trip updates, one row per record
+            
+        Returns:
+            Boolean Series (aligned to df) marking valid rows
+        """
+        if not set(self._trip_update_required).issubset(df.columns):
+            return pd.Series(False, index=df.index)
+        return df[list(self._trip_update_required)].notna().all(axis=1)
     
     def deduplicate_vehicle_positions(self, records: List[Dict]) -> List[Dict]:
         """
@@ -92,7 +167,7 @@ class DataQualityValidator:
         unique_records = []
         
         for record in records:
-            key = f"{record.get('vehicle_id')}_{record.get('timestamp')}"
+            key = (record.get('vehicle_id'), record.get('timestamp'))
             
             if key not in self.seen_vehicles:
                 self.seen_vehicles.add(key)
@@ -115,7 +190,7 @@ class DataQualityValidator:
         unique_records = []
         
         for record in records:
-            key = f"{record.get('trip_id')}_{record.get('stop_id')}_{record.get('feed_timestamp')}"
+            key = (record.get('trip_id'), record.get('stop_id'), record.get('feed_timestamp'))
             
             if key not in self.seen_trip_updates:
                 self.seen_trip_updates.add(key)
@@ -129,54 +204,150 @@ class DataQualityValidator:
         """
         Validate and clean vehicle position records.
         
+        Validation and deduplication happen in a single pass over the records.
+        
         Args:
             records: List of vehicle position records
             
         Returns:
             List of validated and deduplicated records
         """
-        valid_records = []
+        unique_records = []
+        seen = self.seen_vehicles
         
         for record in records:
             self.stats['vehicles_processed'] += 1
             
-            if self.validate_vehicle_position(record):
-                self.stats['vehicles_valid'] += 1
-                valid_records.append(record)
-            else:
+            if not self.validate_vehicle_position(record):
                 self.stats['vehicles_invalid'] += 1
-        
-        # Deduplicate
-        unique_records = self.deduplicate_vehicle_positions(valid_records)
+                continue
+            self.stats['vehicles_valid'] += 1
+            
+            key = (record.get('vehicle_id'), record.get('timestamp'))
+            if key in seen:
+                self.stats['vehicles_duplicate'] += 1
+            else:
+                seen.add(key)
+                unique_records.append(record)
         
         return unique_records
     
+    def validate_and_clean_vehicles_vec(self, records: List[Dict]) -> List[Dict]:
+        """
+        Vectorized equivalent of validate_and_clean_vehicles.
+        
+        Builds one DataFrame and applies the required-field, range and speed
+        checks as boolean masks, then deduplicates with DataFrame.duplicated.
+        Falls back to the per-record loop when pandas is not installed.
+        
+        Args:
+            records: List of vehicle position records
+            
+        Returns:
+            List of validated and deduplicated records (the original dicts)
+        """
+        if not PANDAS_AVAILABLE or not records:
+            return self.validate_and_clean_vehicles(records)
+        
+        df = pd.DataFrame.from_records(records)
+        self.stats['vehicles_processed'] += len(df)
+        
+        if not set(self.VEHICLE_REQUIRED_FIELDS).issubset(df.columns):
+            self.stats['vehicles_invalid'] += len(df)
+            return []
+        
+        valid = self.validate_vehicle_positions_batch(df)
+        n_valid = int(valid.sum())
+        self.stats['vehicles_valid'] += n_valid
+        self.stats['vehicles_invalid'] += len(df) - n_valid
+        
+        # Deduplicate within the batch, then against keys seen in earlier batches
+        valid_df = df.loc[valid, ['vehicle_id', 'timestamp']]
+        keep = ~valid_df.duplicated()
+        keys = list(zip(valid_df['vehicle_id'], valid_df['timestamp']))
+        if self.seen_vehicles:
+            unseen = [key not in self.seen_vehicles for key in keys]
+            keep &= pd.Series(unseen, index=valid_df.index, dtype=bool)
+        
+        self.stats['vehicles_duplicate'] += n_valid - int(keep.sum())
+        self.seen_vehicles.update(key for key, kept in zip(keys, keep) if kept)
+        
+        return [records[i] for i in valid_df.index[keep]]
+    
     def validate_and_clean_trip_updates(self, records: List[Dict]) -> List[Dict]:
         """
         Validate and clean trip update records.
         
+        Validation and deduplication happen in a single pass over the records.
+        
         Args:
             records: List of trip update records
             
         Returns:
             List of validated and deduplicated records
         """
-        valid_records = []
+        unique_records = []
+        seen = self.seen_trip_updates
         
         for record in records:
             self.stats['trip_updates_processed'] += 1
             
-            if self.validate_trip_update(record):
-                self.stats['trip_updates_valid'] += 1
-                valid_records.append(record)
-            else:
+            if not self.validate_trip_update(record):
                 self.stats['trip_updates_invalid'] += 1
-        
-        # Deduplicate
-        unique_records = self.deduplicate_trip_updates(valid_records)
+                continue
+            self.stats['trip_updates_valid'] += 1
+            
+            key = (record.get('trip_id'), record.get('stop_id'), record.get('feed_timestamp'))
+            if key in seen:
+                self.stats['trip_updates_duplicate'] += 1
+            else:
+                seen.add(key)
+                unique_records.append(record)
         
         return unique_records
     
+    def validate_and_clean_trip_updates_vec(self, records: List[Dict]) -> List[Dict]:
+        """
+        Vectorized equivalent of validate_and_clean_trip_updates.
+        
+        Builds one DataFrame, applies validate_trip_updates_batch as a boolean
+        mask, then deduplicates with DataFrame.duplicated. Falls back to the
+        per-record loop when pandas is not installed.
+        
+        Args:
+            records: List of trip update records
+            
+        Returns:
+            List of validated and deduplicated records (the original dicts)
+        """
+        if not PANDAS_AVAILABLE or not records:
+            return self.validate_and_clean_trip_updates(records)
+        
+        df = pd.DataFrame.from_records(records)
+        self.stats['trip_updates_processed'] += len(df)
+        
+        if not set(self.TRIP_UPDATE_REQUIRED_FIELDS).issubset(df.columns):
+            self.stats['trip_updates_invalid'] += len(df)
+            return []
+        
+        valid = self.validate_trip_updates_batch(df)
+        n_valid = int(valid.sum())
+        self.stats['trip_updates_valid'] += n_valid
+        self.stats['trip_updates_invalid'] += len(df) - n_valid
+        
+        # Deduplicate within the batch, then against keys seen in earlier batches
+        valid_df = df.loc[valid, ['trip_id', 'stop_id', 'feed_timestamp']]
+        keep = ~valid_df.duplicated()
+        keys = list(zip(valid_df['trip_id'], valid_df['stop_id'], valid_df['feed_timestamp']))
+        if self.seen_trip_updates:
+            unseen = [key not in self.seen_trip_updates for key in keys]
+            keep &= pd.Series(unseen, index=valid_df.index, dtype=bool)
+        
+        self.stats['trip_updates_duplicate'] += n_valid - int(keep.sum())
+        self.seen_trip_updates.update(key for key, kept in zip(keys, keep) if kept)
+        
+        return [records[i] for i in valid_df.index[keep]]
+    
     def get_stats(self) -> Dict:
         """Get validation statistics."""
         return self.stats.copy()
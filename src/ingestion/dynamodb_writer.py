@@ -3,18 +3,107 @@ DynamoDB writer for processed GTFS-RT records.
 Stores data for fast dashboard queries.
 """
 import boto3
+import logging
+import math
 import os
+import time
+from boto3.dynamodb.types import TypeSerializer
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, TYPE_CHECKING
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 # Get config from environment variables (Lambda)
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-2')
 DYNAMODB_TABLE_NAME = os.getenv('DYNAMODB_TABLE_NAME', 'ets_transit_processed')
 
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_SIZE = 25
+
+# Retries for UnprocessedItems (exponential backoff starting at 50 ms)
+MAX_BATCH_RETRIES = 5
+
+_serializer = TypeSerializer()
+
+# Attributes returned by query_recent_vehicles ('timestamp' is a reserved word)
+VEHICLE_PROJECTION = {
+    'ProjectionExpression': 'vehicle_id, route_id, latitude, longitude, speed, #ts',
+    'ExpressionAttributeNames': {'#ts': 'timestamp'}
+}
+
+# Key of the item recording the latest written timestamp per record type
+LATEST_MARKER_KEY = {'pk': 'META', 'sk': 'latest'}
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb_table(table_name: str):
+    """
+    Create the DynamoDB Table resource once per process.
+    
+    Warm Lambda invocations reuse the module, so the session, service model
+    and endpoint are built only on cold start.
+    
+    Args:
+        table_name: DynamoDB table name
+        
+    Returns:
+        boto3 DynamoDB Table resource
+    """
+    # Use IAM role (default) in Lambda environment
+    dynamodb = boto3.resource('dynamodb', region_name=AWS_DEFAULT_REGION)
+    return dynamodb.Table(table_name)
+
+
+def serialize_attribute(value) -> Dict:
+    """
+    Convert a Python value to a DynamoDB wire-format attribute.
+    
+    Floats are written as {'N': repr(value)} directly, skipping the Decimal
+    conversion the resource layer requires; NaN/inf (not storable) become NULL.
+    
+    Args:
+        value: Attribute value from a parsed record
+        
+    Returns:
+        Wire-format attribute such as {'S': 'abc'} or {'N': '53.54'}
+    """
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, int):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        return {'N': repr(value)} if math.isfinite(value) else {'NULL': True}
+    return _serializer.serialize(value)
+
+
+def latest_timestamp(timestamps: Iterable) -> Optional[str]:
+    """
+    Pick the newest ISO timestamp for the latest marker.
+    
+    Missing values are skipped: str(None) is 'None', which sorts above every
+    ISO timestamp and would pin the marker.
+    
+    Args:
+        timestamps: Timestamp values from the written records
+        
+    Returns:
+        Newest timestamp as a string, or None if no record had one
+    """
+    present = [str(ts) for ts in timestamps if ts is not None and ts != '']
+    return max(present) if present else None
+
 
 class DynamoDBWriter:
     """Writer for GTFS-RT data to AWS DynamoDB."""
@@ -28,9 +117,8 @@ class DynamoDBWriter:
         """
         self.table_name = table_name or DYNAMODB_TABLE_NAME
         
-        # Initialize DynamoDB resource - use IAM role (default) in Lambda environment
-        dynamodb = boto3.resource('dynamodb', region_name=AWS_DEFAULT_REGION)
-        self.table = dynamodb.Table(self.table_name)
+        # Reuse the process-wide Table resource across invocations
+        self.table = get_dynamodb_table(self.table_name)
     
     def convert_floats_to_decimal(self, obj):
         """
@@ -60,6 +148,9 @@ class DynamoDBWriter:
         Returns:
             True if successful, False otherwise
         """
+        # Fallback timestamp in the parser's naive ISO format
+        now_iso = datetime.now().isoformat()
+        
         try:
             # Convert floats to Decimal
             vehicle = self.convert_floats_to_decimal(vehicle)
@@ -67,7 +158,7 @@ class DynamoDBWriter:
             # Add record type and timestamp for querying
             item = {
                 'pk': f"VEHICLE#{vehicle.get('route_id', 'UNKNOWN')}",
-                'sk': f"{vehicle.get('timestamp', datetime.now().isoformat())}#{vehicle.get('vehicle_id', 'UNKNOWN')}",
+                'sk': f"{vehicle.get('timestamp', now_iso)}#{vehicle.get('vehicle_id', 'UNKNOWN')}",
                 'record_type': 'vehicle_position',
                 **vehicle
             }
@@ -76,7 +167,7 @@ class DynamoDBWriter:
             return True
         
         except ClientError as e:
-            print(f"Error writing vehicle to DynamoDB: {e}")
+            logger.error("Error writing vehicle to DynamoDB: %s", e)
             return False
     
     def write_trip_update(self, trip_update: Dict) -> bool:
@@ -89,6 +180,9 @@ class DynamoDBWriter:
         Returns:
             True if successful, False otherwise
         """
+        # Fallback timestamp in the parser's naive ISO format
+        now_iso = datetime.now().isoformat()
+        
         try:
             # Convert floats to Decimal
             trip_update = self.convert_floats_to_decimal(trip_update)
@@ -96,7 +190,7 @@ class DynamoDBWriter:
             # Add record type and timestamp for querying
             item = {
                 'pk': f"TRIP#{trip_update.get('route_id', 'UNKNOWN')}",
-                'sk': f"{trip_update.get('feed_timestamp', datetime.now().isoformat())}#{trip_update.get('trip_id', 'UNKNOWN')}#{trip_update.get('stop_id', 'UNKNOWN')}",
+                'sk': f"{trip_update.get('feed_timestamp', now_iso)}#{trip_update.get('trip_id', 'UNKNOWN')}#{trip_update.get('stop_id', 'UNKNOWN')}",
                 'record_type': 'trip_update',
                 **trip_update
             }
@@ -105,9 +199,80 @@ class DynamoDBWriter:
             return True
         
         except ClientError as e:
-            print(f"Error writing trip update to DynamoDB: {e}")
+            logger.error("Error writing trip update to DynamoDB: %s", e)
+            return False
+    
+    def update_latest_marker(self, record_type: str, latest_timestamp: str) -> bool:
+        """
+        Record the newest written timestamp for a record type.
+        
+        The dashboard reads this single item to decide whether its cached data
+        is still current before querying the full record set.
+        
+        Args:
+            record_type: 'vehicle_position' or 'trip_update'
+            latest_timestamp: Newest ISO timestamp in the written batch
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self.table.update_item(
+                Key=LATEST_MARKER_KEY,
+                UpdateExpression='SET #rt = :ts',
+                ExpressionAttributeNames={'#rt': record_type},
+                ExpressionAttributeValues={':ts': latest_timestamp}
+            )
+            return True
+        
+        except ClientError as e:
+            logger.error("Error updating latest marker in DynamoDB: %s", e)
             return False
     
+    def _batch_put_items(self, items: List[Dict]) -> int:
+        """
+        Write pre-built items with the low-level BatchWriteItem API.
+        
+        Items are serialized straight to wire format, deduplicated on (pk, sk)
+        (DynamoDB rejects a batch with repeated keys), sent 25 per call, and
+        UnprocessedItems are retried with exponential backoff. None-valued
+        fields are omitted rather than stored as NULL attributes.
+        
+        Args:
+            items: Fully built records with plain Python values
+            
+        Returns:
+            Number of items written
+        """
+        client = self.table.meta.client
+        
+        # Later items win on duplicate keys, as with put_item
+        unique = {(item['pk'], item['sk']): item for item in items}
+        requests = [
+            {'PutRequest': {'Item': {k: serialize_attribute(v) for k, v in item.items() if v is not None}}}
+            for item in unique.values()
+        ]
+        
+        failed = 0
+        for i in range(0, len(requests), BATCH_WRITE_SIZE):
+            pending = requests[i:i + BATCH_WRITE_SIZE]
+            
+            for attempt in range(MAX_BATCH_RETRIES + 1):
+                if attempt:
+                    time.sleep(0.05 * 2 ** (attempt - 1))
+                try:
+                    response = client.batch_write_item(RequestItems={self.table_name: pending})
+                except ClientError as e:
+                    logger.error("Error in batch write to DynamoDB: %s", e)
+                    break
+                pending = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                if not pending:
+                    break
+            
+            failed += len(pending)
+        
+        return len(requests) - failed
+    
     def batch_write_vehicles(self, vehicles: List[Dict]) -> int:
         """
         Batch write vehicle position records to DynamoDB.
@@ -118,33 +283,78 @@ class DynamoDBWriter:
         Returns:
             Number of successfully written records
         """
-        success_count = 0
-        
-        # DynamoDB batch write supports up to 25 items at a time
-        batch_size = 25
-        
-        for i in range(0, len(vehicles), batch_size):
-            batch = vehicles[i:i + batch_size]
-            
-            with self.table.batch_writer() as writer:
-                for vehicle in batch:
-                    try:
-                        vehicle = self.convert_floats_to_decimal(vehicle)
-                        
-                        item = {
-                            'pk': f"VEHICLE#{vehicle.get('route_id', 'UNKNOWN')}",
-                            'sk': f"{vehicle.get('timestamp', datetime.now().isoformat())}#{vehicle.get('vehicle_id', 'UNKNOWN')}",
-                            'record_type': 'vehicle_position',
-                            **vehicle
-                        }
-                        
-                        writer.put_item(Item=item)
-                        success_count += 1
-                    
-                    except Exception as e:
-                        print(f"Error in batch write for vehicle: {e}")
-        
-        print(f"Wrote {success_count}/{len(vehicles)} vehicle positions to DynamoDB")
+        # Build every item up front; the fallback timestamp is formatted once per batch
+        now_iso = datetime.now().isoformat()
+        items = [
+            {
+                'pk': f"VEHICLE#{vehicle.get('route_id', 'UNKNOWN')}",
+                'sk': f"{vehicle.get('timestamp', now_iso)}#{vehicle.get('vehicle_id', 'UNKNOWN')}",
+                'record_type': 'vehicle_position',
+                **vehicle
+            }
+            for vehicle in vehicles
+        ]
+        
+        success_count = self._batch_put_items(items)
+        logger.debug("Wrote %d/%d vehicle positions to DynamoDB", success_count, len(vehicles))
+        
+        latest = latest_timestamp(v.get('timestamp') for v in vehicles)
+        if success_count and latest is not None:
+            self.update_latest_marker('vehicle_position', latest)
+        return success_count
+    
+    def batch_write_vehicles_df(self, df: 'pd.DataFrame') -> int:
+        """
+        Batch write vehicle positions straight from a DataFrame.
+        
+        Avoids materializing df.to_dict('records'): each column is converted
+        to Python values once and the items are assembled by zipping the
+        columns row-wise. Items match batch_write_vehicles for the same data:
+        datetimes become the parser's ISO strings and missing values (NaN,
+        NaT, None) are omitted.
+        
+        Args:
+            df: Vehicle positions with the parser's column names
+            
+        Returns:
+            Number of successfully written records
+        """
+        columns = list(df.columns)
+        values = []
+        for col in columns:
+            column = df[col]
+            missing = column.isna().to_numpy()
+            if column.dtype.kind == 'M':
+                column_values = [None if m else ts.isoformat() for ts, m in zip(column.tolist(), missing)]
+            elif missing.any():
+                column_values = [None if m else v for v, m in zip(column.tolist(), missing)]
+            else:
+                column_values = column.tolist()
+            values.append(column_values)
+        
+        route_idx = columns.index('route_id') if 'route_id' in columns else None
+        vehicle_idx = columns.index('vehicle_id') if 'vehicle_id' in columns else None
+        timestamp_idx = columns.index('timestamp') if 'timestamp' in columns else None
+        
+        now_iso = datetime.now().isoformat()
+        items = []
+        for row in zip(*values):
+            route_id = row[route_idx] if route_idx is not None else 'UNKNOWN'
+            vehicle_id = row[vehicle_idx] if vehicle_idx is not None else 'UNKNOWN'
+            timestamp = row[timestamp_idx] if timestamp_idx is not None else now_iso
+            items.append({
+                'pk': f"VEHICLE#{route_id}",
+                'sk': f"{timestamp}#{vehicle_id}",
+                'record_type': 'vehicle_position',
+                **dict(zip(columns, row))
+            })
+        
+        success_count = self._batch_put_items(items)
+        logger.debug("Wrote %d/%d vehicle positions to DynamoDB", success_count, len(df))
+        
+        latest = latest_timestamp(values[timestamp_idx]) if timestamp_idx is not None else None
+        if success_count and latest is not None:
+            self.update_latest_marker('vehicle_position', latest)
         return success_count
     
     def batch_write_trip_updates(self, trip_updates: List[Dict]) -> int:
@@ -157,33 +367,24 @@ class DynamoDBWriter:
         Returns:
             Number of successfully written records
         """
-        success_count = 0
-        
-        # DynamoDB batch write supports up to 25 items at a time
-        batch_size = 25
-        
-        for i in range(0, len(trip_updates), batch_size):
-            batch = trip_updates[i:i + batch_size]
-            
-            with self.table.batch_writer() as writer:
-                for trip_update in batch:
-                    try:
-                        trip_update = self.convert_floats_to_decimal(trip_update)
-                        
-                        item = {
-                            'pk': f"TRIP#{trip_update.get('route_id', 'UNKNOWN')}",
-                            'sk': f"{trip_update.get('feed_timestamp', datetime.now().isoformat())}#{trip_update.get('trip_id', 'UNKNOWN')}#{trip_update.get('stop_id', 'UNKNOWN')}",
-                            'record_type': 'trip_update',
-                            **trip_update
-                        }
-                        
-                        writer.put_item(Item=item)
-                        success_count += 1
-                    
-                    except Exception as e:
-                        print(f"Error in batch write for trip update: {e}")
-        
-        print(f"Wrote {success_count}/{len(trip_updates)} trip updates to DynamoDB")
+        # Build every item up front; the fallback timestamp is formatted once per batch
+        now_iso = datetime.now().isoformat()
+        items = [
+            {
+                'pk': f"TRIP#{trip_update.get('route_id', 'UNKNOWN')}",
+                'sk': f"{trip_update.get('feed_timestamp', now_iso)}#{trip_update.get('trip_id', 'UNKNOWN')}#{trip_update.get('stop_id', 'UNKNOWN')}",
+                'record_type': 'trip_update',
+                **trip_update
+            }
+            for trip_update in trip_updates
+        ]
+        
+        success_count = self._batch_put_items(items)
+        logger.debug("Wrote %d/%d trip updates to DynamoDB", success_count, len(trip_updates))
+        
+        latest = latest_timestamp(t.get('feed_timestamp') for t in trip_updates)
+        if success_count and latest is not None:
+            self.update_latest_marker('trip_update', latest)
         return success_count
     
     def query_recent_vehicles(self, route_id: str = None, limit: int = 100) -> List[Dict]:
@@ -203,20 +404,22 @@ class DynamoDBWriter:
                     KeyConditionExpression='pk = :pk',
                     ExpressionAttributeValues={':pk': f"VEHICLE#{route_id}"},
                     Limit=limit,
-                    ScanIndexForward=False  # Most recent first
+                    ScanIndexForward=False,  # Most recent first
+                    **VEHICLE_PROJECTION
                 )
             else:
                 # Scan for all vehicles (less efficient, use sparingly)
                 response = self.table.scan(
                     FilterExpression='record_type = :type',
                     ExpressionAttributeValues={':type': 'vehicle_position'},
-                    Limit=limit
+                    Limit=limit,
+                    **VEHICLE_PROJECTION
                 )
             
             return response.get('Items', [])
         
         except ClientError as e:
-            print(f"Error querying vehicles: {e}")
+            logger.error("Error querying vehicles: %s", e)
             return []
 
 
@@ -2,12 +2,23 @@
 GTFS Real-Time protobuf parser for Edmonton Transit System.
 Parses Vehicle Positions and Trip Updates feeds.
 """
+import logging
 import requests
+from requests.adapters import HTTPAdapter
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from google.protobuf.internal import api_implementation
 from google.transit import gtfs_realtime_pb2
 
+logger = logging.getLogger(__name__)
+
+# Native (upb/cpp) protobuf decoding is an order of magnitude faster than pure Python
+PROTOBUF_BACKEND = api_implementation.Type()
+if PROTOBUF_BACKEND == 'python':
+    logger.warning("protobuf is using the pure-Python backend; install protobuf>=4.21 wheels for fast feed parsing")
+
 # Get config from environment variables (Lambda)
 GTFS_RT_VEHICLE_POSITIONS_URL = os.getenv(
     'GTFS_RT_VEHICLE_POSITIONS_URL',
@@ -18,6 +29,46 @@ GTFS_RT_TRIP_UPDATES_URL = os.getenv(
     'https://gtfs.edmonton.ca/TMGTFSRealTimeWebService/TripUpdate/TripUpdates.pb'
 )
 
+# Shared keep-alive session: warm Lambda invocations reuse the TCP/TLS
+# connection to the feed host instead of reconnecting on every poll
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+# Record schemas emitted by the parser, in column order
+VEHICLE_FIELDS = (
+    'vehicle_id', 'trip_id', 'route_id', 'latitude', 'longitude', 'bearing', 'speed',
+    'timestamp', 'current_stop_sequence', 'current_status', 'congestion_level', 'feed_timestamp'
+)
+TRIP_UPDATE_FIELDS = (
+    'trip_id', 'route_id', 'vehicle_id', 'stop_id', 'stop_sequence', 'arrival_delay',
+    'arrival_time', 'departure_delay', 'departure_time', 'schedule_relationship', 'feed_timestamp'
+)
+
+
+def records_to_columns(records: List[Dict], fields: Tuple[str, ...]) -> Dict[str, list]:
+    """
+    Transpose parsed records into one list per field (struct-of-arrays).
+    
+    The validator and DynamoDB writer work per record, so the parser keeps
+    emitting dicts; columnar writers convert once at the serialization boundary.
+    
+    Args:
+        records: List of parsed records
+        fields: Field names to extract, in column order
+        
+    Returns:
+        Dictionary mapping each field to its list of values
+    """
+    return {field: [record.get(field) for record in records] for field in fields}
+
+
+class _IsoTimestamps(dict):
+    """Memo of epoch seconds -> naive ISO string, filled on first lookup."""
+    
+    def __missing__(self, ts: int) -> str:
+        iso = self[ts] = datetime.fromtimestamp(ts).isoformat()
+        return iso
+
 
 class GTFSRealtimeParser:
     """Parser for GTFS-RT protobuf feeds."""
@@ -38,15 +89,18 @@ class GTFSRealtimeParser:
             Parsed FeedMessage or None if fetch fails
         """
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+            # Read the body in one call instead of joining response.content chunks,
+            # which briefly holds the payload twice; urllib3 still un-gzips it
+            with HTTP_SESSION.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                content = response.raw.read(decode_content=True)
             
             feed = gtfs_realtime_pb2.FeedMessage()
-            feed.ParseFromString(response.content)
+            feed.ParseFromString(content)
             
             return feed
         except Exception as e:
-            print(f"Error fetching protobuf feed from {url}: {e}")
+            logger.error("Error fetching protobuf feed from %s: %s", url, e)
             return None
     
     def parse_vehicle_positions(self) -> List[Dict]:
@@ -56,34 +110,58 @@ class GTFSRealtimeParser:
         Returns:
             List of dictionaries with vehicle position data
         """
-        feed = self.fetch_protobuf_feed(self.vehicle_positions_url)
+        return self._vehicle_records(self.fetch_protobuf_feed(self.vehicle_positions_url))
+    
+    def _vehicle_records(self, feed: Optional[gtfs_realtime_pb2.FeedMessage]) -> List[Dict]:
+        """
+        Convert a Vehicle Positions FeedMessage into structured records.
+        
+        Args:
+            feed: Parsed feed, or None if the fetch failed
+            
+        Returns:
+            List of dictionaries with vehicle position data
+        """
         if not feed:
             return []
         
         vehicles = []
+        append = vehicles.append
+        
+        # Constant for the whole feed, so format it once
+        now_iso = datetime.now().isoformat()
+        # Vehicle timestamps cluster on a few seconds, so most are cache hits
+        iso_timestamps = _IsoTimestamps()
+        feed_timestamp = datetime.fromtimestamp(feed.header.timestamp).isoformat() if feed.header.HasField('timestamp') else now_iso
         
         for entity in feed.entity:
             if entity.HasField('vehicle'):
                 vehicle = entity.vehicle
+                # Bind HasField once per message; check each sub-message's presence once
+                has = vehicle.HasField
+                has_trip = has('trip')
+                trip = vehicle.trip
+                position = vehicle.position if has('position') else None
+                has_position_field = position.HasField if position is not None else None
                 
                 record = {
-                    'vehicle_id': vehicle.vehicle.id if vehicle.HasField('vehicle') else None,
-                    'trip_id': vehicle.trip.trip_id if vehicle.HasField('trip') else None,
-                    'route_id': vehicle.trip.route_id if vehicle.HasField('trip') else None,
-                    'latitude': vehicle.position.latitude if vehicle.HasField('position') else None,
-                    'longitude': vehicle.position.longitude if vehicle.HasField('position') else None,
-                    'bearing': vehicle.position.bearing if vehicle.HasField('position') and vehicle.position.HasField('bearing') else None,
-                    'speed': vehicle.position.speed if vehicle.HasField('position') and vehicle.position.HasField('speed') else None,
-                    'timestamp': datetime.fromtimestamp(vehicle.timestamp).isoformat() if vehicle.HasField('timestamp') else datetime.now().isoformat(),
-                    'current_stop_sequence': vehicle.current_stop_sequence if vehicle.HasField('current_stop_sequence') else None,
-                    'current_status': vehicle.current_status if vehicle.HasField('current_status') else None,
-                    'congestion_level': vehicle.congestion_level if vehicle.HasField('congestion_level') else None,
-                    'feed_timestamp': datetime.fromtimestamp(feed.header.timestamp).isoformat() if feed.header.HasField('timestamp') else datetime.now().isoformat()
+                    'vehicle_id': vehicle.vehicle.id if has('vehicle') else None,
+                    'trip_id': trip.trip_id if has_trip else None,
+                    'route_id': trip.route_id if has_trip else None,
+                    'latitude': position.latitude if position is not None else None,
+                    'longitude': position.longitude if position is not None else None,
+                    'bearing': position.bearing if position is not None and has_position_field('bearing') else None,
+                    'speed': position.speed if position is not None and has_position_field('speed') else None,
+                    'timestamp': iso_timestamps[vehicle.timestamp] if has('timestamp') else now_iso,
+                    'current_stop_sequence': vehicle.current_stop_sequence if has('current_stop_sequence') else None,
+                    'current_status': vehicle.current_status if has('current_status') else None,
+                    'congestion_level': vehicle.congestion_level if has('congestion_level') else None,
+                    'feed_timestamp': feed_timestamp
                 }
                 
-                vehicles.append(record)
+                append(record)
         
-        print(f"Parsed {len(vehicles)} vehicle positions")
+        logger.debug("Parsed %d vehicle positions", len(vehicles))
         return vehicles
     
     def parse_trip_updates(self) -> List[Dict]:
@@ -93,51 +171,90 @@ class GTFSRealtimeParser:
         Returns:
             List of dictionaries with trip update data (delays at each stop)
         """
-        feed = self.fetch_protobuf_feed(self.trip_updates_url)
+        return self._trip_update_records(self.fetch_protobuf_feed(self.trip_updates_url))
+    
+    def _trip_update_records(self, feed: Optional[gtfs_realtime_pb2.FeedMessage]) -> List[Dict]:
+        """
+        Convert a Trip Updates FeedMessage into structured records.
+        
+        Args:
+            feed: Parsed feed, or None if the fetch failed
+            
+        Returns:
+            List of dictionaries with trip update data (delays at each stop)
+        """
         if not feed:
             return []
         
         updates = []
+        append = updates.append
+        
+        # Constant for the whole feed, so format it once
+        feed_timestamp = datetime.fromtimestamp(feed.header.timestamp).isoformat() if feed.header.HasField('timestamp') else datetime.now().isoformat()
+        # Predicted arrival/departure times repeat heavily across stops and trips
+        iso_timestamps = _IsoTimestamps()
         
         for entity in feed.entity:
             if entity.HasField('trip_update'):
                 trip_update = entity.trip_update
                 
-                trip_id = trip_update.trip.trip_id if trip_update.HasField('trip') else None
-                route_id = trip_update.trip.route_id if trip_update.HasField('trip') else None
+                has_trip = trip_update.HasField('trip')
+                trip_id = trip_update.trip.trip_id if has_trip else None
+                route_id = trip_update.trip.route_id if has_trip else None
                 vehicle_id = trip_update.vehicle.id if trip_update.HasField('vehicle') else None
                 
                 # Each trip update has multiple stop_time_updates
                 for stop_time_update in trip_update.stop_time_update:
+                    has = stop_time_update.HasField
+                    arrival = stop_time_update.arrival if has('arrival') else None
+                    departure = stop_time_update.departure if has('departure') else None
+                    
                     record = {
                         'trip_id': trip_id,
                         'route_id': route_id,
                         'vehicle_id': vehicle_id,
-                        'stop_id': stop_time_update.stop_id if stop_time_update.HasField('stop_id') else None,
-                        'stop_sequence': stop_time_update.stop_sequence if stop_time_update.HasField('stop_sequence') else None,
-                        'arrival_delay': stop_time_update.arrival.delay if stop_time_update.HasField('arrival') and stop_time_update.arrival.HasField('delay') else None,
-                        'arrival_time': datetime.fromtimestamp(stop_time_update.arrival.time).isoformat() if stop_time_update.HasField('arrival') and stop_time_update.arrival.HasField('time') else None,
-                        'departure_delay': stop_time_update.departure.delay if stop_time_update.HasField('departure') and stop_time_update.departure.HasField('delay') else None,
-                        'departure_time': datetime.fromtimestamp(stop_time_update.departure.time).isoformat() if stop_time_update.HasField('departure') and stop_time_update.departure.HasField('time') else None,
-                        'schedule_relationship': stop_time_update.schedule_relationship if stop_time_update.HasField('schedule_relationship') else None,
-                        'feed_timestamp': datetime.fromtimestamp(feed.header.timestamp).isoformat() if feed.header.HasField('timestamp') else datetime.now().isoformat()
+                        'stop_id': stop_time_update.stop_id if has('stop_id') else None,
+                        'stop_sequence': stop_time_update.stop_sequence if has('stop_sequence') else None,
+                        'arrival_delay': arrival.delay if arrival is not None and arrival.HasField('delay') else None,
+                        'arrival_time': iso_timestamps[arrival.time] if arrival is not None and arrival.HasField('time') else None,
+                        'departure_delay': departure.delay if departure is not None and departure.HasField('delay') else None,
+                        'departure_time': iso_timestamps[departure.time] if departure is not None and departure.HasField('time') else None,
+                        'schedule_relationship': stop_time_update.schedule_relationship if has('schedule_relationship') else None,
+                        'feed_timestamp': feed_timestamp
                     }
                     
-                    updates.append(record)
+                    append(record)
         
-        print(f"Parsed {len(updates)} trip updates")
+        logger.debug("Parsed %d trip updates", len(updates))
         return updates
     
     def parse_all(self) -> Dict[str, List[Dict]]:
         """
         Parse both Vehicle Positions and Trip Updates.
         
+        Both feeds are downloaded concurrently since the fetches are I/O-bound;
+        the entity conversion then runs on the calling thread.
+        
         Returns:
-            Dictionary with 'vehicles' and 'trip_updates' keys
+            Dictionary with 'vehicles' and 'trip_updates' record lists, plus
+            'unavailable' naming the feeds that could not be fetched (as opposed
+            to feeds that were fetched but empty)
         """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            vehicle_future = executor.submit(self.fetch_protobuf_feed, self.vehicle_positions_url)
+            trip_update_future = executor.submit(self.fetch_protobuf_feed, self.trip_updates_url)
+            vehicle_feed = vehicle_future.result()
+            trip_update_feed = trip_update_future.result()
+        
+        unavailable = [
+            name for name, feed in (('vehicles', vehicle_feed), ('trip_updates', trip_update_feed))
+            if feed is None
+        ]
+        
         return {
-            'vehicles': self.parse_vehicle_positions(),
-            'trip_updates': self.parse_trip_updates()
+            'vehicles': self._vehicle_records(vehicle_feed),
+            'trip_updates': self._trip_update_records(trip_update_feed),
+            'unavailable': unavailable
         }
 
 
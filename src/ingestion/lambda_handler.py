@@ -3,12 +3,65 @@ AWS Lambda handler for GTFS-RT data ingestion.
 Orchestrates the complete ETL pipeline: fetch, parse, validate, upload to S3, and write to DynamoDB.
 """
 import json
+import logging
+import os
+import boto3
 from datetime import datetime
+from typing import List
+from botocore.exceptions import ClientError
 from ingestion.gtfs_rt_parser import GTFSRealtimeParser
 from ingestion.data_quality import DataQualityValidator
 from ingestion.s3_uploader import S3Uploader
 from ingestion.dynamodb_writer import DynamoDBWriter
 
+# The Lambda runtime installs its own root handler (so basicConfig is a no-op
+# there); setting the level explicitly lets LOG_LEVEL=DEBUG restore per-step logs
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+logging.basicConfig(level=LOG_LEVEL)
+logging.getLogger().setLevel(LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Region for the CloudWatch client, with the same fallback as the S3 and DynamoDB clients
+AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-2')
+
+# Created once per container; warm invocations reuse the boto3 clients and HTTP session
+_PARSER = GTFSRealtimeParser()
+_UPLOADER = S3Uploader()
+_DB_WRITER = DynamoDBWriter()
+_CLOUDWATCH = boto3.client('cloudwatch', region_name=AWS_DEFAULT_REGION)
+
+# CloudWatch namespace for pipeline health metrics
+METRIC_NAMESPACE = 'ETSTransit/Ingestion'
+
+
+def report_unavailable_feeds(feeds: List[str]):
+    """
+    Publish a FeedUnavailable metric per feed that could not be fetched.
+    
+    Lets alarms fire on upstream outages instead of leaving silent data gaps.
+    
+    Args:
+        feeds: Names of the unavailable feeds ('vehicles', 'trip_updates')
+    """
+    if not feeds:
+        return
+    
+    try:
+        _CLOUDWATCH.put_metric_data(
+            Namespace=METRIC_NAMESPACE,
+            MetricData=[
+                {
+                    'MetricName': 'FeedUnavailable',
+                    'Dimensions': [{'Name': 'Feed', 'Value': feed}],
+                    'Value': 1,
+                    'Unit': 'Count'
+                }
+                for feed in feeds
+            ]
+        )
+    except ClientError as e:
+        logger.error("Error publishing feed availability metric: %s", e)
+
 
 def handler(event, context):
     """
@@ -21,45 +74,57 @@ def handler(event, context):
     Returns:
         Response with status code and statistics
     """
-    print(f"Starting GTFS-RT ingestion at {datetime.now().isoformat()}")
+    logger.info("Starting GTFS-RT ingestion at %s", datetime.now().isoformat())
     
     try:
         # Step 1: Parse GTFS-RT feeds
-        print("Step 1: Parsing GTFS-RT feeds...")
-        parser = GTFSRealtimeParser()
-        data = parser.parse_all()
+        logger.debug("Step 1: Parsing GTFS-RT feeds...")
+        data = _PARSER.parse_all()
         
         vehicles = data['vehicles']
         trip_updates = data['trip_updates']
         
-        print(f"Parsed {len(vehicles)} vehicles, {len(trip_updates)} trip updates")
+        logger.info("Parsed %d vehicles, %d trip updates", len(vehicles), len(trip_updates))
+        
+        if data['unavailable']:
+            logger.warning("Feeds unavailable: %s", data['unavailable'])
+            report_unavailable_feeds(data['unavailable'])
+        
+        # Nothing to validate, upload or write
+        if not vehicles and not trip_updates:
+            logger.info("No records parsed; skipping S3 upload and DynamoDB write")
+            return {
+                'statusCode': 204,
+                'body': json.dumps({
+                    'timestamp': datetime.now().isoformat(),
+                    'unavailable_feeds': data['unavailable']
+                })
+            }
         
         # Step 2: Validate and clean data
-        print("Step 2: Validating and cleaning data...")
+        logger.debug("Step 2: Validating and cleaning data...")
+        # Fresh per invocation: stats and dedup keys describe this snapshot only
         validator = DataQualityValidator()
         
         clean_vehicles = validator.validate_and_clean_vehicles(vehicles)
         clean_trip_updates = validator.validate_and_clean_trip_updates(trip_updates)
         
         stats = validator.get_stats()
-        print(f"Validation stats: {stats}")
+        logger.info("Validation stats: %s", stats)
         
         # Step 3: Upload to S3
-        print("Step 3: Uploading to S3...")
-        uploader = S3Uploader()
+        logger.debug("Step 3: Uploading to S3...")
         timestamp = datetime.now()
         
-        s3_keys = uploader.upload_all(clean_vehicles, clean_trip_updates, timestamp)
-        print(f"Uploaded to S3: {s3_keys}")
+        s3_keys = _UPLOADER.upload_all(clean_vehicles, clean_trip_updates, timestamp)
+        logger.info("Uploaded to S3: %s", s3_keys)
         
         # Step 4: Write to DynamoDB
-        print("Step 4: Writing to DynamoDB...")
-        db_writer = DynamoDBWriter()
-        
-        vehicles_written = db_writer.batch_write_vehicles(clean_vehicles)
-        trip_updates_written = db_writer.batch_write_trip_updates(clean_trip_updates)
+        logger.debug("Step 4: Writing to DynamoDB...")
+        vehicles_written = _DB_WRITER.batch_write_vehicles(clean_vehicles)
+        trip_updates_written = _DB_WRITER.batch_write_trip_updates(clean_trip_updates)
         
-        print(f"Written to DynamoDB: {vehicles_written} vehicles, {trip_updates_written} trip updates")
+        logger.info("Written to DynamoDB: %d vehicles, %d trip updates", vehicles_written, trip_updates_written)
         
         # Prepare response
         response = {
@@ -83,11 +148,11 @@ def handler(event, context):
             })
         }
         
-        print(f"Ingestion completed successfully")
+        logger.info("Ingestion completed successfully")
         return response
     
     except Exception as e:
-        print(f"Error in Lambda handler: {e}")
+        logger.exception("Error in Lambda handler: %s", e)
         
         return {
             'statusCode': 500,
@@ -1,19 +1,84 @@
 """
 S3 uploader for GTFS-RT data.
-Uploads validated JSON to S3 with date-based partitioning.
+Uploads validated records to S3 as Parquet (or JSON) with date-based partitioning.
 """
+import gzip
 import json
 import boto3
+import logging
 import os
 from datetime import datetime
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from .gtfs_rt_parser import records_to_columns
+
+logger = logging.getLogger(__name__)
+
+# Optional: columnar Parquet output
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Optional: faster JSON encoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Get config from environment variables (Lambda)
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-2')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'ets-transit-data')
+S3_OUTPUT_FORMAT = os.getenv('S3_OUTPUT_FORMAT', 'parquet')
+
+# Request params are built by this module only, so botocore's per-call
+# validation is skipped; keep-alive and bounded retries suit the 30s schedule
+S3_CLIENT_CONFIG = Config(
+    parameter_validation=False,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'total_max_attempts': 3},
+    max_pool_connections=4
+)
+
+if PYARROW_AVAILABLE:
+    # Explicit schemas keep column types stable across files; route/stop ids
+    # are dictionary-encoded since they repeat heavily within a snapshot
+    PARQUET_SCHEMAS = {
+        'vehicles': pa.schema([
+            ('vehicle_id', pa.string()),
+            ('trip_id', pa.string()),
+            ('route_id', pa.dictionary(pa.int32(), pa.string())),
+            ('latitude', pa.float32()),
+            ('longitude', pa.float32()),
+            ('bearing', pa.float32()),
+            ('speed', pa.float32()),
+            ('timestamp', pa.string()),
+            ('current_stop_sequence', pa.int32()),
+            ('current_status', pa.int8()),
+            ('congestion_level', pa.int8()),
+            ('feed_timestamp', pa.string()),
+        ]),
+        'trip_updates': pa.schema([
+            ('trip_id', pa.string()),
+            ('route_id', pa.dictionary(pa.int32(), pa.string())),
+            ('vehicle_id', pa.string()),
+            ('stop_id', pa.dictionary(pa.int32(), pa.string())),
+            ('stop_sequence', pa.int32()),
+            ('arrival_delay', pa.int32()),
+            ('arrival_time', pa.string()),
+            ('departure_delay', pa.int32()),
+            ('departure_time', pa.string()),
+            ('schedule_relationship', pa.int8()),
+            ('feed_timestamp', pa.string()),
+        ]),
+    }
 
 
 class S3Uploader:
@@ -28,16 +93,20 @@ class S3Uploader:
         """
         self.bucket_name = bucket_name or S3_BUCKET_NAME
         
+        # Parquet when pyarrow is installed; S3_OUTPUT_FORMAT=json keeps the legacy output
+        self.output_format = 'parquet' if S3_OUTPUT_FORMAT == 'parquet' and PYARROW_AVAILABLE else 'json'
+        
         # Initialize S3 client - use IAM role (default) in Lambda environment
-        self.s3_client = boto3.client('s3', region_name=AWS_DEFAULT_REGION)
+        self.s3_client = boto3.client('s3', region_name=AWS_DEFAULT_REGION, config=S3_CLIENT_CONFIG)
     
-    def generate_s3_key(self, data_type: str, timestamp: datetime = None) -> str:
+    def generate_s3_key(self, data_type: str, timestamp: datetime = None, extension: str = 'json') -> str:
         """
         Generate S3 key with date-based partitioning.
         
         Args:
             data_type: Type of data ('vehicles' or 'trip_updates')
             timestamp: Timestamp for partitioning (defaults to now)
+            extension: File extension ('json' or 'parquet')
             
         Returns:
             S3 key string like 'transit/vehicles/20240101/20240101_100000.json'
@@ -48,7 +117,7 @@ class S3Uploader:
         date_str = timestamp.strftime('%Y%m%d')
         time_str = timestamp.strftime('%Y%m%d_%H%M%S')
         
-        return f"transit/{data_type}/{date_str}/{time_str}.json"
+        return f"transit/{data_type}/{date_str}/{time_str}.{extension}"
     
     def upload_json(self, data: List[Dict], data_type: str, timestamp: datetime = None) -> str:
         """
@@ -63,30 +132,91 @@ class S3Uploader:
             S3 key of uploaded file
         """
         if not data:
-            print(f"No {data_type} data to upload")
+            logger.debug("No %s data to upload", data_type)
             return None
         
         s3_key = self.generate_s3_key(data_type, timestamp)
         
-        # Convert to JSON
-        json_data = json.dumps(data, indent=2)
+        # Compact JSON bytes; gzip level 1 already shrinks the repetitive records ~10x
+        if ORJSON_AVAILABLE:
+            json_data = orjson.dumps(data)
+        else:
+            json_data = json.dumps(data, separators=(',', ':')).encode('utf-8')
         
         try:
             # Upload to S3
             self.s3_client.put_object(
                 Bucket=self.bucket_name,
                 Key=s3_key,
-                Body=json_data.encode('utf-8'),
-                ContentType='application/json'
+                Body=gzip.compress(json_data, compresslevel=1),
+                ContentType='application/json',
+                ContentEncoding='gzip'
             )
             
-            print(f"Uploaded {len(data)} {data_type} records to s3://{self.bucket_name}/{s3_key}")
+            logger.debug("Uploaded %d %s records to s3://%s/%s", len(data), data_type, self.bucket_name, s3_key)
             return s3_key
         
         except ClientError as e:
-            print(f"Error uploading to S3: {e}")
+            logger.error("Error uploading to S3: %s", e)
             return None
     
+    def upload_parquet(self, data: List[Dict], data_type: str, timestamp: datetime = None) -> str:
+        """
+        Upload data as Snappy-compressed Parquet to S3.
+        
+        Args:
+            data: List of records to upload
+            data_type: Type of data ('vehicles' or 'trip_updates')
+            timestamp: Timestamp for partitioning
+            
+        Returns:
+            S3 key of uploaded file
+        """
+        if not data:
+            logger.debug("No %s data to upload", data_type)
+            return None
+        
+        s3_key = self.generate_s3_key(data_type, timestamp, extension='parquet')
+        
+        # Build the table column-wise against the fixed schema
+        schema = PARQUET_SCHEMAS[data_type]
+        table = pa.Table.from_pydict(records_to_columns(data, tuple(schema.names)), schema=schema)
+        
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink, compression='snappy', use_dictionary=True)
+        
+        try:
+            # Upload to S3
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=sink.getvalue().to_pybytes(),
+                ContentType='application/vnd.apache.parquet'
+            )
+            
+            logger.debug("Uploaded %d %s records to s3://%s/%s", len(data), data_type, self.bucket_name, s3_key)
+            return s3_key
+        
+        except ClientError as e:
+            logger.error("Error uploading to S3: %s", e)
+            return None
+    
+    def upload_records(self, data: List[Dict], data_type: str, timestamp: datetime = None) -> str:
+        """
+        Upload data in the configured output format.
+        
+        Args:
+            data: List of records to upload
+            data_type: Type of data ('vehicles' or 'trip_updates')
+            timestamp: Timestamp for partitioning
+            
+        Returns:
+            S3 key of uploaded file
+        """
+        if self.output_format == 'parquet':
+            return self.upload_parquet(data, data_type, timestamp)
+        return self.upload_json(data, data_type, timestamp)
+    
     def upload_vehicles(self, vehicles: List[Dict], timestamp: datetime = None) -> str:
         """
         Upload vehicle position data to S3.
@@ -98,7 +228,7 @@ class S3Uploader:
         Returns:
             S3 key of uploaded file
         """
-        return self.upload_json(vehicles, 'vehicles', timestamp)
+        return self.upload_records(vehicles, 'vehicles', timestamp)
     
     def upload_trip_updates(self, trip_updates: List[Dict], timestamp: datetime = None) -> str:
         """
@@ -111,7 +241,7 @@ class S3Uploader:
         Returns:
             S3 key of uploaded file
         """
-        return self.upload_json(trip_updates, 'trip_updates', timestamp)
+        return self.upload_records(trip_updates, 'trip_updates', timestamp)
     
     def upload_all(self, vehicles: List[Dict], trip_updates: List[Dict], timestamp: datetime = None) -> Dict[str, str]:
         """
@@ -125,10 +255,19 @@ class S3Uploader:
         Returns:
             Dictionary with 'vehicles' and 'trip_updates' S3 keys
         """
-        return {
-            'vehicles': self.upload_vehicles(vehicles, timestamp),
-            'trip_updates': self.upload_trip_updates(trip_updates, timestamp)
-        }
+        # Both objects share one partition timestamp
+        if timestamp is None:
+            timestamp = datetime.now()
+        
+        # The PUTs are latency-bound, so run them side by side (boto3 clients are thread-safe)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            vehicles_key = executor.submit(self.upload_vehicles, vehicles, timestamp)
+            trip_updates_key = executor.submit(self.upload_trip_updates, trip_updates, timestamp)
+            
+            return {
+                'vehicles': vehicles_key.result(),
+                'trip_updates': trip_updates_key.result()
+            }
     
     def list_files(self, data_type: str, date: str = None) -> List[str]:
         """
@@ -158,7 +297,7 @@ class S3Uploader:
                 return []
         
         except ClientError as e:
-            print(f"Error listing S3 objects: {e}")
+            logger.error("Error listing S3 objects: %s", e)
             return []
 
 
@@ -0,0 +1,60 @@
+"""
+Convert the trained delay model to ONNX for native inference.
+Writes delay_model.onnx next to the joblib artifact so the prediction service picks it up.
+"""
+import joblib
+from pathlib import Path
+from src.ml.predict import ONNX_SOURCE_KEY, file_sha256
+
+# Optional: only needed when converting, not when serving
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    SKL2ONNX_AVAILABLE = True
+except ImportError:
+    SKL2ONNX_AVAILABLE = False
+
+
+def convert_model_to_onnx(model_path: str = None, onnx_path: str = None) -> Path:
+    """
+    Convert a saved scikit-learn delay model to ONNX.
+    
+    Args:
+        model_path: Path to the joblib model (uses default if None)
+        onnx_path: Output path (defaults to the model path with a .onnx suffix)
+        
+    Returns:
+        Path to the written ONNX file
+    """
+    if not SKL2ONNX_AVAILABLE:
+        raise ImportError("skl2onnx is required for ONNX conversion: pip install skl2onnx")
+    
+    if model_path is None:
+        model_path = Path(__file__).parent / 'model_artifacts' / 'delay_model.joblib'
+    model_path = Path(model_path)
+    onnx_path = Path(onnx_path) if onnx_path else model_path.with_suffix('.onnx')
+    
+    model_data = joblib.load(model_path)
+    feature_names = model_data['feature_names']
+    
+    # Single float32 input matching the service's feature matrix. The exported
+    # tree ensemble stores thresholds and leaf values as float32, half the
+    # size of sklearn's float64 arrays; int8 dynamic quantization only targets
+    # MatMul/Gemm weights, so it would not shrink a tree model further
+    onnx_model = convert_sklearn(
+        model_data['model'],
+        initial_types=[('input', FloatTensorType([None, len(feature_names)]))]
+    )
+    
+    # Record which joblib this export came from so the service can detect a stale file
+    source = onnx_model.metadata_props.add()
+    source.key, source.value = ONNX_SOURCE_KEY, file_sha256(model_path)
+    
+    onnx_path.write_bytes(onnx_model.SerializeToString())
+    print(f"ONNX model saved to: {onnx_path}")
+    
+    return onnx_path
+
+
+if __name__ == '__main__':
+    convert_model_to_onnx()
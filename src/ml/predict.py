@@ -2,12 +2,42 @@
 Prediction service for trained delay models.
 Loads serialized model and serves predictions.
 """
+import hashlib
 import joblib
+import threading
+import warnings
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Union
 
+# Optional: native inference for models exported by convert_to_onnx.py
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# ONNX metadata key holding the SHA-256 of the joblib model it was exported from
+ONNX_SOURCE_KEY = 'source_sha256'
+
+
+def file_sha256(path: Path) -> str:
+    """
+    Compute the SHA-256 of a file.
+    
+    Args:
+        path: File to hash
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class DelayPredictionService:
     """Service for loading and using trained delay prediction models."""
@@ -22,6 +52,8 @@ class DelayPredictionService:
         self.model_data = None
         self.model = None
         self.feature_names = None
+        self.onnx_session = None
+        self._load_lock = threading.Lock()
         
         # Default model path
         if model_path is None:
@@ -30,10 +62,8 @@ class DelayPredictionService:
         
         self.model_path = Path(model_path)
         
-        # Load model if it exists
-        if self.model_path.exists():
-            self.load_model()
-        else:
+        # The model is loaded on first use so cold starts that never predict skip it
+        if not self.model_path.exists():
             print(f"Warning: Model not found at {self.model_path}")
             print("Train a model first using train_model.py")
     
@@ -43,9 +73,23 @@ class DelayPredictionService:
             print(f"Loading model from {self.model_path}...")
             self.model_data = joblib.load(self.model_path)
             
-            self.model = self.model_data['model']
             self.feature_names = self.model_data['feature_names']
             
+            # Prefer an exported ONNX sibling for inference, but only if it was
+            # exported from this exact joblib; a stale export would serve an old model
+            onnx_path = self.model_path.with_suffix('.onnx')
+            if ONNXRUNTIME_AVAILABLE and onnx_path.exists():
+                session = ort.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider'])
+                source = session.get_modelmeta().custom_metadata_map.get(ONNX_SOURCE_KEY)
+                if source == file_sha256(self.model_path):
+                    self.onnx_session = session
+                    print(f"Using ONNX Runtime model: {onnx_path}")
+                else:
+                    print(f"Warning: {onnx_path} was not exported from this model, using joblib")
+            
+            # Set last: other threads treat a non-None model as fully loaded
+            self.model = self.model_data['model']
+            
             print(f"Model loaded successfully!")
             print(f"Model type: {self.model_data['model_type']}")
             print(f"Trained at: {self.model_data['trained_at']}")
@@ -59,6 +103,13 @@ class DelayPredictionService:
             print(f"Error loading model: {e}")
             raise
     
+    def _ensure_model_loaded(self):
+        """Load the model on first use (thread-safe, no-op once loaded)."""
+        if self.model is None and self.model_path.exists():
+            with self._load_lock:
+                if self.model is None:
+                    self.load_model()
+    
     def predict(self, features: Union[Dict, pd.DataFrame]) -> Union[float, np.ndarray]:
         """
         Predict delay for given features.
@@ -69,6 +120,7 @@ class DelayPredictionService:
         Returns:
             Predicted delay in minutes (float for single prediction, array for batch)
         """
+        self._ensure_model_loaded()
         if self.model is None:
             raise ValueError("Model not loaded. Train a model first.")
         
@@ -81,10 +133,11 @@ class DelayPredictionService:
             missing = [col for col in self.feature_names if col not in features.columns]
             raise ValueError(f"Missing required features: {missing}")
         
-        X = features[self.feature_names]
-        
         # Make prediction
-        predictions = self.model.predict(X)
+        if self.onnx_session is not None:
+            predictions = self._predict_onnx(features[self.feature_names].to_numpy(dtype=np.float32))
+        else:
+            predictions = self.model.predict(features[self.feature_names])
         
         # Return single value if single prediction, otherwise array
         if len(predictions) == 1:
@@ -101,10 +154,44 @@ class DelayPredictionService:
         Returns:
             List of predicted delays in minutes
         """
-        df = pd.DataFrame(features_list)
-        predictions = self.predict(df)
+        self._ensure_model_loaded()
+        if self.model is None:
+            raise ValueError("Model not loaded. Train a model first.")
+        
+        if not features_list:
+            return []
+        
+        # Build the feature matrix directly instead of going through a DataFrame
+        try:
+            X = np.array(
+                [[features[name] for name in self.feature_names] for features in features_list],
+                dtype=np.float32
+            )
+        except KeyError as e:
+            raise ValueError(f"Missing required features: {list(e.args)}")
+        
+        if self.onnx_session is not None:
+            return self._predict_onnx(X).tolist()
+        
+        # The model was fitted on a DataFrame; a bare array is fine since columns are in order
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            predictions = self.model.predict(X)
+        
         return predictions.tolist()
     
+    def _predict_onnx(self, X: np.ndarray) -> np.ndarray:
+        """
+        Run the ONNX Runtime session on a float32 feature matrix.
+        
+        Args:
+            X: Array of shape (n_samples, n_features) in feature_names order
+            
+        Returns:
+            1-D array of predicted delays
+        """
+        return self.onnx_session.run(None, {'input': X})[0].ravel()
+    
     def get_model_info(self) -> Dict:
         """
         Get information about the loaded model.
@@ -112,6 +199,7 @@ class DelayPredictionService:
         Returns:
             Dictionary with model metadata
         """
+        self._ensure_model_loaded()
         if self.model_data is None:
             return {'status': 'No model loaded'}
         
@@ -119,6 +207,7 @@ class DelayPredictionService:
             'model_type': self.model_data.get('model_type'),
             'trained_at': self.model_data.get('trained_at'),
             'feature_names': self.feature_names,
+            'onnx_runtime': self.onnx_session is not None,
             'training_stats': self.model_data.get('training_stats', {})
         }
 
@@ -0,0 +1,123 @@
+"""
+Quantize a trained Random Forest's leaf values to 8 bits.
+Writes a compact forest the prediction service can load in place of the joblib model.
+"""
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.ensemble import RandomForestRegressor
+
+# Optional: LZ4 compression for the quantized artifact
+try:
+    import lz4  # noqa: F401
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+
+class QuantizedForestRegressor:
+    """Random Forest with uint8 leaf values and per-tree scale/offset."""
+    
+    def __init__(self, forest: RandomForestRegressor):
+        """
+        Flatten and quantize a fitted scikit-learn forest.
+        
+        Args:
+            forest: Fitted single-output RandomForestRegressor
+        """
+        trees = [est.tree_ for est in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        
+        self.roots = offsets[:-1].astype(np.int32)
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.n_features_in_ = forest.n_features_in_
+        self.feature_importances_ = forest.feature_importances_
+        
+        left, right, feature, threshold, codes = [], [], [], [], []
+        self.lo = np.empty(len(trees))
+        self.scale = np.empty(len(trees))
+        
+        for i, tree in enumerate(trees):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            # Leaves point at themselves so traversal can run a fixed number of steps
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offsets[i])
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offsets[i])
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            
+            # Map this tree's leaf range onto 0..255
+            values = tree.value.ravel()
+            lo, hi = values[is_leaf].min(), values[is_leaf].max()
+            scale = (hi - lo) / 255 if hi > lo else 1.0
+            codes.append(np.where(is_leaf, np.round((values - lo) / scale), 0).astype(np.uint8))
+            self.lo[i], self.scale[i] = lo, scale
+        
+        self.children_left = np.concatenate(left).astype(np.int32)
+        self.children_right = np.concatenate(right).astype(np.int32)
+        self.feature = np.concatenate(feature).astype(np.int16)
+        # Thresholds stay float64 so splits match scikit-learn exactly
+        self.threshold = np.concatenate(threshold)
+        self.leaf_codes = np.concatenate(codes)
+    
+    @property
+    def max_error(self) -> float:
+        """Upper bound on the prediction error introduced by quantization."""
+        return float(self.scale.max() / 2)
+    
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict by walking every tree for every row, then dequantizing leaves.
+        
+        Args:
+            X: Feature matrix (DataFrame or array) in training column order
+            
+        Returns:
+            Array of predictions
+        """
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        
+        # One node per (tree, row); all trees descend together
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node], self.children_right[node])
+        
+        leaf_values = self.leaf_codes[node] * self.scale[:, None] + self.lo[:, None]
+        return leaf_values.mean(axis=0)
+
+
+def quantize_model(model_path: str = None, output_path: str = None) -> Path:
+    """
+    Quantize a saved Random Forest delay model.
+    
+    Args:
+        model_path: Path to the joblib model (uses default if None)
+        output_path: Output path (defaults to <model>_int8.joblib)
+        
+    Returns:
+        Path to the written quantized model
+    """
+    if model_path is None:
+        model_path = Path(__file__).parent / 'model_artifacts' / 'delay_model.joblib'
+    model_path = Path(model_path)
+    output_path = Path(output_path) if output_path else model_path.with_name(f"{model_path.stem}_int8.joblib")
+    
+    model_data = joblib.load(model_path)
+    if not isinstance(model_data['model'], RandomForestRegressor):
+        raise ValueError(f"Only random forest models can be quantized, got {type(model_data['model']).__name__}")
+    
+    quantized = QuantizedForestRegressor(model_data['model'])
+    model_data = {**model_data, 'model': quantized}
+    
+    joblib.dump(model_data, output_path, compress=('lz4', 3) if LZ4_AVAILABLE else 0)
+    print(f"Quantized model saved to: {output_path}")
+    print(f"Maximum quantization error: {quantized.max_error:.4f} minutes")
+    
+    return output_path
+
+
+if __name__ == '__main__':
+    quantize_model()
@@ -6,7 +6,6 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Optional
-from sklearn.preprocessing import LabelEncoder
 
 
 class FeatureEngineer:
@@ -14,8 +13,11 @@ class FeatureEngineer:
     
     def __init__(self):
         """Initialize the feature engineer."""
-        self.route_encoder = LabelEncoder()
+        # Sorted route categories seen at fit time; codes match LabelEncoder's
+        self.route_categories = None
         self.fitted = False
+        # Output column layout per (input columns, target, weather) combination
+        self._output_cols_cache = {}
     
     def extract_temporal_features(self, df: pd.DataFrame, timestamp_col: str = 'feed_timestamp') -> pd.DataFrame:
         """
@@ -33,27 +35,43 @@ class FeatureEngineer:
         # Convert to datetime if not already
         df[timestamp_col] = pd.to_datetime(df[timestamp_col])
         
-        # Extract hour of day (0-23)
-        df['hour_of_day'] = df[timestamp_col].dt.hour
+        # Derive every feature from wall-clock epoch seconds in one NumPy pass
+        # (tz-aware stamps keep their local hour, as with the .dt accessors)
+        timestamps = df[timestamp_col]
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_localize(None)
+        seconds = timestamps.to_numpy(dtype='datetime64[s]').astype(np.int64)
+        missing = timestamps.isna().to_numpy()
         
-        # Extract day of week (0=Monday, 6=Sunday)
-        df['day_of_week'] = df[timestamp_col].dt.dayofweek
+        # Hour of day (0-23) and day of week (0=Monday; 1970-01-01 was a Thursday)
+        hour = (seconds // 3600 % 24).astype(np.int32)
+        day_of_week = ((seconds // 86400 + 3) % 7).astype(np.int32)
         
-        # Is weekend (Saturday=5, Sunday=6)
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+        # Is weekend (Saturday=5, Sunday=6) / rush hour (7-9 AM or 4-6 PM)
+        is_weekend = ((day_of_week >= 5) & ~missing).astype(np.int64)
+        is_rush_hour = (
+            (((hour >= 7) & (hour <= 9)) | ((hour >= 16) & (hour <= 18))) & ~missing
+        ).astype(np.int64)
         
-        # Is rush hour (7-9 AM or 4-6 PM)
-        df['is_rush_hour'] = (
-            ((df['hour_of_day'] >= 7) & (df['hour_of_day'] <= 9)) |
-            ((df['hour_of_day'] >= 16) & (df['hour_of_day'] <= 18))
-        ).astype(int)
+        # Time of day: [0, 6] night, (6, 12] morning, (12, 18] afternoon, (18, 24] evening
+        time_codes = np.searchsorted(np.array([6, 12, 18]), hour, side='left')
+        time_codes[missing] = -1
+        time_of_day = pd.Categorical.from_codes(
+            time_codes,
+            categories=['night', 'morning', 'afternoon', 'evening'],
+            ordered=True
+        )
+        
+        if missing.any():
+            hour = np.where(missing, np.nan, hour)
+            day_of_week = np.where(missing, np.nan, day_of_week)
         
-        # Time of day category
-        df['time_of_day'] = pd.cut(
-            df['hour_of_day'],
-            bins=[0, 6, 12, 18, 24],
-            labels=['night', 'morning', 'afternoon', 'evening'],
-            include_lowest=True
+        df = df.assign(
+            hour_of_day=hour,
+            day_of_week=day_of_week,
+            is_weekend=is_weekend,
+            is_rush_hour=is_rush_hour,
+            time_of_day=time_of_day
         )
         
         return df
@@ -72,15 +90,26 @@ class FeatureEngineer:
         df = df.copy()
         
         if 'route_id' in df.columns:
+            routes = df['route_id'].astype(str)
             if fit:
-                # Fit and transform
-                df['route_id_encoded'] = self.route_encoder.fit_transform(df['route_id'].astype(str))
+                # Fit and transform: category codes over the sorted distinct routes
+                encoded = pd.Categorical(routes)
+                self.route_categories = encoded.categories
                 self.fitted = True
             else:
                 if not self.fitted:
                     raise ValueError("Encoder must be fitted before transform")
-                # Transform only
-                df['route_id_encoded'] = self.route_encoder.transform(df['route_id'].astype(str))
+                # Transform only: align to the fitted categories
+                encoded = pd.Categorical(routes, categories=self.route_categories)
+            
+            codes = encoded.codes.astype(np.int32)
+            missing = routes.isna().to_numpy()
+            if not fit and (codes[~missing] < 0).any():
+                raise ValueError("route_id contains previously unseen labels")
+            
+            # Missing routes go after every label, as LabelEncoder orders NaN last
+            codes[missing] = len(self.route_categories)
+            df['route_id_encoded'] = codes
         
         return df
     
@@ -95,8 +124,6 @@ class FeatureEngineer:
         Returns:
             DataFrame with weather_temp column
         """
-        df = df.copy()
-        
         if temperature is None:
             # Try to fetch from weather API
             try:
@@ -105,9 +132,9 @@ class FeatureEngineer:
             except:
                 temperature = None
         
-        df['weather_temp'] = temperature if temperature is not None else np.nan
-        
-        return df
+        # One reading for the whole batch, so the column is constant
+        value = temperature if temperature is not None else np.nan
+        return df.assign(weather_temp=np.full(len(df), value, dtype=np.float64))
     
     def create_feature_set(
         self,
@@ -136,10 +163,32 @@ class FeatureEngineer:
         # Encode categorical features
         df = self.encode_categorical_features(df, fit=fit_encoders)
         
-        # Add weather (optional)
+        # Add weather (optional); the column is a single reading or all NaN,
+        # so there is nothing to mean-impute
         if include_weather:
             df = self.add_weather_feature(df)
         
+        # Batches share a schema, so the column layout is resolved once per schema
+        cache_key = (tuple(df.columns), target_col, include_weather)
+        output_cols = self._output_cols_cache.get(cache_key)
+        if output_cols is None:
+            output_cols = self._resolve_output_columns(df.columns, target_col, include_weather)
+            self._output_cols_cache[cache_key] = output_cols
+        
+        return df[list(output_cols)]
+    
+    def _resolve_output_columns(self, columns: pd.Index, target_col: str, include_weather: bool) -> tuple:
+        """
+        Work out which identifier, feature and target columns to output.
+        
+        Args:
+            columns: Columns of the engineered DataFrame
+            target_col: Name of target column
+            include_weather: If True, include weather features (P1)
+            
+        Returns:
+            Tuple of output column names in order
+        """
         # Select feature columns
         feature_cols = [
             'hour_of_day',
@@ -150,24 +199,22 @@ class FeatureEngineer:
         ]
         
         # Add stop_sequence if available
-        if 'stop_sequence' in df.columns:
+        if 'stop_sequence' in columns:
             feature_cols.append('stop_sequence')
         
         # Add weather if included
-        if include_weather and 'weather_temp' in df.columns:
+        if include_weather and 'weather_temp' in columns:
             feature_cols.append('weather_temp')
-            # Fill missing weather values with mean
-            df['weather_temp'] = df['weather_temp'].fillna(df['weather_temp'].mean())
         
         # Keep target and identifiers
         id_cols = ['trip_id', 'route_id', 'stop_id', 'feed_timestamp']
-        id_cols = [col for col in id_cols if col in df.columns]
+        id_cols = [col for col in id_cols if col in columns]
         
         output_cols = id_cols + feature_cols
-        if target_col in df.columns:
+        if target_col in columns:
             output_cols.append(target_col)
         
-        return df[output_cols]
+        return tuple(output_cols)
     
     def get_feature_names(self, include_weather: bool = False) -> list:
         """
@@ -3,17 +3,135 @@ Static GTFS schedule data loader for Edmonton Transit System.
 Downloads and parses the static GTFS ZIP to build a master schedule DataFrame.
 """
 import os
+import json
+import hashlib
+import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import BinaryIO, Dict, List, Optional, Union
+import numpy as np
 import pandas as pd
-import requests
 from src.utils.config import GTFS_STATIC_ZIP_URL
+from src.utils.http import HTTP_SESSION
+
+# Optional: multithreaded Arrow CSV parser and compute kernels
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# GTFS IDs and times are strings: type inference would turn stop_id "0001"
+# into 1 and break joins against the real-time feed's string IDs
+GTFS_STRING_COLUMNS = (
+    'shape_id', 'block_id', 'route_short_name', 'route_long_name', 'trip_headsign', 'stop_name', 'stop_code',
+    'parent_station', 'arrival_time', 'departure_time', 'stop_headsign', 'date'
+)
+# Narrow numeric types keep the multi-million-row schedule small; float32
+# coordinates resolve to under half a metre, route_type covers extended codes
+GTFS_NUMERIC_TYPES = {
+    'stop_sequence': 'int32',
+    'route_type': 'int16',
+    'stop_lat': 'float32',
+    'stop_lon': 'float32'
+}
+# Join keys are dictionary-encoded while parsing, so merges hash int codes
+GTFS_KEY_COLUMNS = ('route_id', 'trip_id', 'service_id', 'stop_id')
+
+
+def _read_gtfs_csv(path: Union[Path, BinaryIO], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a GTFS text file with ID and time columns kept as strings.
+    
+    Args:
+        path: Path to the GTFS .txt file, or an open binary stream of it
+        columns: Columns to parse, in output order (all if None); optional GTFS
+            columns missing from the file come back empty
+        
+    Returns:
+        DataFrame with the file's contents
+    """
+    if PYARROW_AVAILABLE:
+        column_types = {col: pa.string() for col in GTFS_STRING_COLUMNS}
+        column_types.update({col: pa.type_for_alias(dtype) for col, dtype in GTFS_NUMERIC_TYPES.items()})
+        column_types.update({col: pa.dictionary(pa.int32(), pa.string()) for col in GTFS_KEY_COLUMNS})
+        table = pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=64 << 20),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                strings_can_be_null=True,
+                include_columns=columns,
+                include_missing_columns=columns is not None
+            )
+        )
+        # Release Arrow buffers as columns are converted to avoid doubling peak memory
+        return table.to_pandas(self_destruct=True, split_blocks=True)
+    
+    dtype = {col: str for col in GTFS_STRING_COLUMNS}
+    dtype.update(GTFS_NUMERIC_TYPES)
+    dtype.update({col: 'category' for col in GTFS_KEY_COLUMNS})
+    if columns is None:
+        return pd.read_csv(path, dtype=dtype)
+    df = pd.read_csv(path, dtype=dtype, usecols=lambda col: col in columns)
+    return df.reindex(columns=columns)
+
+
+def _gtfs_times_to_seconds(times: pd.Series) -> np.ndarray:
+    """
+    Convert GTFS HH:MM:SS strings to int32 seconds since midnight.
+    
+    Each distinct time is parsed once; hours past 24 are kept for
+    after-midnight service, and missing or malformed times become 0.
+    
+    Args:
+        times: Series of GTFS time strings
+        
+    Returns:
+        Array of int32 seconds aligned with times
+    """
+    codes, uniques = pd.factorize(times)
+    if len(uniques) == 0:
+        return np.zeros(len(times), dtype=np.int32)
+    
+    parts = pd.Series(uniques, dtype=object).str.split(':', expand=True).reindex(columns=range(3))
+    hms = parts.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    hms[hms != np.floor(hms)] = np.nan
+    seconds = hms @ np.array([3600.0, 60.0, 1.0])
+    seconds = np.nan_to_num(seconds, nan=0.0).astype(np.int32)
+    
+    # Code -1 marks missing values
+    return np.where(codes >= 0, seconds[codes], 0).astype(np.int32)
+
+
+def _share_categories(key: str, *frames: pd.DataFrame) -> None:
+    """
+    Recode a join key in each frame onto one shared set of categories.
+    
+    Merging categoricals only compares codes when both sides have identical
+    categories; each file's dictionary differs, so align them first.
+    
+    Args:
+        key: Join key column
+        frames: DataFrames holding the key, updated in place
+    """
+    columns = [frame[key].astype('category') for frame in frames]
+    categories = columns[0].cat.categories
+    for column in columns[1:]:
+        categories = categories.union(column.cat.categories)
+    for frame, column in zip(frames, columns):
+        frame[key] = column.cat.set_categories(categories)
 
 
 class StaticGTFSLoader:
     """Loader for Edmonton Transit static GTFS schedule data."""
     
+    REQUIRED_FILES = ['routes.txt', 'trips.txt', 'stops.txt', 'stop_times.txt']
+    OPTIONAL_FILES = ['calendar.txt', 'calendar_dates.txt']
+    
     def __init__(self, cache_dir: str = 'data/static_gtfs'):
         """
         Initialize the GTFS loader.
@@ -24,13 +142,25 @@ class StaticGTFSLoader:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.gtfs_zip_path = self.cache_dir / 'gtfs.zip'
+        # Joined schedule and the hash of the ZIP it was built from
+        self.master_parquet = self.cache_dir / 'master_schedule.parquet'
+        self.stamp = self.cache_dir / 'gtfs.zip.sha256'
+        # Server validators (ETag / Last-Modified) of the cached ZIP
+        self.zip_meta = self.cache_dir / 'gtfs.zip.meta.json'
+        # Calendar dates fetched from the API when the ZIP has none
+        self.calendar_dates_parquet = self.cache_dir / 'calendar_dates.parquet'
+        # Pre-aggregated views of the master schedule for dashboard queries
+        self.summary_paths = {
+            name: self.cache_dir / f'{name}.parquet' for name in ('by_route', 'stops_per_hour')
+        }
         
     def download_gtfs_zip(self, force_refresh: bool = False) -> Path:
         """
         Download the static GTFS ZIP file if not already cached.
         
         Args:
-            force_refresh: If True, re-download even if file exists
+            force_refresh: If True, re-check the server even if file exists;
+                the ZIP is only re-downloaded when the server reports a change
             
         Returns:
             Path to the downloaded ZIP file
@@ -39,14 +169,35 @@ class StaticGTFSLoader:
             print(f"Using cached GTFS ZIP: {self.gtfs_zip_path}")
             return self.gtfs_zip_path
         
-        print(f"Downloading GTFS ZIP from {GTFS_STATIC_ZIP_URL}...")
-        response = requests.get(GTFS_STATIC_ZIP_URL, timeout=60)
-        response.raise_for_status()
+        # Conditional GET: a 304 means the cached ZIP is still current
+        headers = {}
+        if self.gtfs_zip_path.exists() and self.zip_meta.exists():
+            meta = json.loads(self.zip_meta.read_text())
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
         
-        with open(self.gtfs_zip_path, 'wb') as f:
-            f.write(response.content)
+        print(f"Downloading GTFS ZIP from {GTFS_STATIC_ZIP_URL}...")
+        # Stream to a partial file in 1 MB chunks instead of buffering the whole
+        # ZIP, then rename so an interrupted download never looks cached
+        partial_path = self.gtfs_zip_path.with_suffix('.zip.part')
+        with HTTP_SESSION.get(GTFS_STATIC_ZIP_URL, headers=headers, timeout=60, stream=True) as response:
+            if response.status_code == 304:
+                print(f"GTFS ZIP unchanged on server, using cached: {self.gtfs_zip_path}")
+                return self.gtfs_zip_path
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(partial_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+            meta = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        os.replace(partial_path, self.gtfs_zip_path)
+        self.zip_meta.write_text(json.dumps(meta))
         
-        print(f"Downloaded {len(response.content)} bytes to {self.gtfs_zip_path}")
+        print(f"Downloaded {self.gtfs_zip_path.stat().st_size} bytes to {self.gtfs_zip_path}")
         return self.gtfs_zip_path
     
     def extract_gtfs_files(self) -> Dict[str, Path]:
@@ -56,50 +207,78 @@ class StaticGTFSLoader:
         Returns:
             Dictionary mapping file names to their extracted paths
         """
-        required_files = ['routes.txt', 'trips.txt', 'stops.txt', 'stop_times.txt']
-        optional_files = ['calendar.txt', 'calendar_dates.txt']
-        
         extracted_files = {}
         
         with zipfile.ZipFile(self.gtfs_zip_path, 'r') as zip_ref:
-            for filename in required_files + optional_files:
+            for filename in self.REQUIRED_FILES + self.OPTIONAL_FILES:
                 try:
                     zip_ref.extract(filename, self.cache_dir)
                     extracted_files[filename] = self.cache_dir / filename
                     print(f"Extracted {filename}")
                 except KeyError:
-                    if filename in required_files:
+                    if filename in self.REQUIRED_FILES:
                         raise FileNotFoundError(f"Required file {filename} not found in GTFS ZIP")
                     else:
                         print(f"Optional file {filename} not found, skipping")
         
         return extracted_files
     
-    def load_routes(self) -> pd.DataFrame:
-        """Load routes.txt as DataFrame."""
-        routes_path = self.cache_dir / 'routes.txt'
-        df = pd.read_csv(routes_path)
+    def _zip_members(self) -> set:
+        """Names of the files in the cached GTFS ZIP (empty if not downloaded)."""
+        if not self.gtfs_zip_path.exists():
+            return set()
+        with zipfile.ZipFile(self.gtfs_zip_path, 'r') as zip_ref:
+            return set(zip_ref.namelist())
+    
+    def _require_gtfs_files(self):
+        """Raise FileNotFoundError if the GTFS ZIP lacks a required file."""
+        members = self._zip_members()
+        for filename in self.REQUIRED_FILES:
+            if filename not in members:
+                raise FileNotFoundError(f"Required file {filename} not found in GTFS ZIP")
+    
+    def _read_gtfs_file(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read a GTFS file straight out of the ZIP, falling back to an extracted copy.
+        
+        Streaming the member avoids writing each file to disk and reading it back.
+        
+        Args:
+            filename: GTFS file name, e.g. 'stop_times.txt'
+            columns: Columns to parse (all if None)
+            
+        Returns:
+            DataFrame with the file's contents
+        """
+        if filename in self._zip_members():
+            with zipfile.ZipFile(self.gtfs_zip_path, 'r') as zip_ref, zip_ref.open(filename) as f:
+                return _read_gtfs_csv(f, columns)
+        return _read_gtfs_csv(self.cache_dir / filename, columns)
+    
+    def load_routes(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load routes.txt as DataFrame, optionally parsing only the given columns."""
+        df = self._read_gtfs_file('routes.txt', columns)
         print(f"Loaded {len(df)} routes")
         return df
     
-    def load_trips(self) -> pd.DataFrame:
-        """Load trips.txt as DataFrame."""
-        trips_path = self.cache_dir / 'trips.txt'
-        df = pd.read_csv(trips_path)
+    def load_trips(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load trips.txt as DataFrame, optionally parsing only the given columns."""
+        df = self._read_gtfs_file('trips.txt', columns)
         print(f"Loaded {len(df)} trips")
         return df
     
-    def load_stops(self) -> pd.DataFrame:
-        """Load stops.txt as DataFrame."""
-        stops_path = self.cache_dir / 'stops.txt'
-        df = pd.read_csv(stops_path)
+    def load_stops(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load stops.txt as DataFrame, optionally parsing only the given columns."""
+        df = self._read_gtfs_file('stops.txt', columns)
         print(f"Loaded {len(df)} stops")
         return df
     
-    def load_stop_times(self) -> pd.DataFrame:
-        """Load stop_times.txt as DataFrame."""
-        stop_times_path = self.cache_dir / 'stop_times.txt'
-        df = pd.read_csv(stop_times_path)
+    def load_stop_times(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load stop_times.txt as DataFrame, optionally parsing only the given columns."""
+        df = self._read_gtfs_file('stop_times.txt', columns)
+        # Parse arrival times once here rather than in every downstream consumer
+        if 'arrival_time' in df.columns:
+            df['arrival_seconds'] = _gtfs_times_to_seconds(df['arrival_time'])
         print(f"Loaded {len(df)} stop times")
         return df
     
@@ -113,9 +292,21 @@ class StaticGTFSLoader:
         """
         calendar_dates_path = self.cache_dir / 'calendar_dates.txt'
         
-        # Try local file first
+        # Try the GTFS ZIP first
+        if 'calendar_dates.txt' in self._zip_members():
+            df = self._read_gtfs_file('calendar_dates.txt')
+            print(f"Loaded {len(df)} calendar dates from GTFS ZIP")
+            return df
+        
+        # Then the typed cache of an earlier API fetch
+        if PYARROW_AVAILABLE and self.calendar_dates_parquet.exists():
+            df = pd.read_parquet(self.calendar_dates_parquet)
+            print(f"Loaded {len(df)} calendar dates from cache")
+            return df
+        
+        # Then a local file
         if calendar_dates_path.exists():
-            df = pd.read_csv(calendar_dates_path)
+            df = _read_gtfs_csv(calendar_dates_path)
             print(f"Loaded {len(df)} calendar dates from local file")
             return df
         
@@ -124,13 +315,18 @@ class StaticGTFSLoader:
         api_url = "https://data.edmonton.ca/resource/f2sy-bth7.json"
         
         try:
-            response = requests.get(api_url, params={'$limit': 10000}, timeout=30)
+            response = HTTP_SESSION.get(api_url, params={'$limit': 10000}, timeout=30)
             response.raise_for_status()
             data = response.json()
             
             df = pd.DataFrame(data)
-            # Save to cache for future use
-            df.to_csv(calendar_dates_path, index=False)
+            # Save to cache for future use, typed like the GTFS file reader's output
+            if PYARROW_AVAILABLE:
+                df = df.astype({'service_id': 'category', 'date': 'str'})
+                df['exception_type'] = pd.to_numeric(df['exception_type']).astype('int8')
+                df.to_parquet(self.calendar_dates_parquet, engine='pyarrow', compression='snappy', index=False)
+            else:
+                df.to_csv(calendar_dates_path, index=False)
             print(f"Fetched and cached {len(df)} calendar dates")
             return df
         except Exception as e:
@@ -151,39 +347,46 @@ class StaticGTFSLoader:
             - arrival_time, departure_time, stop_sequence
             - day_of_week (derived from date)
         """
-        # Load all required tables
-        routes = self.load_routes()
-        trips = self.load_trips()
-        stops = self.load_stops()
-        stop_times = self.load_stop_times()
-        calendar_dates = self.load_calendar_dates()
+        # Load all required tables concurrently, parsing only the columns the
+        # schedule keeps; decompression and CSV parsing release the GIL
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            routes = executor.submit(self.load_routes, ['route_id', 'route_short_name', 'route_long_name', 'route_type'])
+            trips = executor.submit(self.load_trips, ['trip_id', 'route_id', 'service_id', 'trip_headsign'])
+            stops = executor.submit(self.load_stops, ['stop_id', 'stop_name', 'stop_lat', 'stop_lon'])
+            stop_times = executor.submit(self.load_stop_times, ['trip_id', 'stop_id', 'arrival_time', 'departure_time', 'stop_sequence'])
+            calendar_dates = executor.submit(self.load_calendar_dates)
+            routes, trips, stops = routes.result(), trips.result(), stops.result()
+            stop_times, calendar_dates = stop_times.result(), calendar_dates.result()
+        
+        # Align each key's categories across the frames it joins
+        _share_categories('trip_id', stop_times, trips)
+        _share_categories('route_id', trips, routes)
+        _share_categories('stop_id', stop_times, stops)
+        if not calendar_dates.empty:
+            _share_categories('service_id', trips, calendar_dates)
         
         # Join stop_times with trips
-        schedule = stop_times.merge(
-            trips[['trip_id', 'route_id', 'service_id', 'trip_headsign']],
-            on='trip_id',
-            how='left'
-        )
+        schedule = stop_times.merge(trips, on='trip_id', how='left')
         
         # Join with routes
-        schedule = schedule.merge(
-            routes[['route_id', 'route_short_name', 'route_long_name', 'route_type']],
-            on='route_id',
-            how='left'
-        )
+        schedule = schedule.merge(routes, on='route_id', how='left')
         
         # Join with stops
-        schedule = schedule.merge(
-            stops[['stop_id', 'stop_name', 'stop_lat', 'stop_lon']],
-            on='stop_id',
-            how='left'
-        )
+        schedule = schedule.merge(stops, on='stop_id', how='left')
         
         # If calendar_dates available, join to get date information
         if not calendar_dates.empty:
-            # Convert date column to datetime
-            calendar_dates['date'] = pd.to_datetime(calendar_dates['date'], format='%Y%m%d')
-            calendar_dates['day_of_week'] = calendar_dates['date'].dt.dayofweek
+            # Convert date column to datetime and derive day_of_week (Monday=0);
+            # int8 is ample for 0-6 and this column is repeated for every joined row
+            if PYARROW_AVAILABLE:
+                # Arrow's compiled kernels parse and extract the weekday directly
+                dates = pc.strptime(pa.array(calendar_dates['date'], type=pa.string()), format='%Y%m%d', unit='us')
+                calendar_dates['date'] = dates.to_numpy(zero_copy_only=False)
+                calendar_dates['day_of_week'] = pc.day_of_week(dates).to_numpy(zero_copy_only=False).astype('int8')
+            else:
+                # cache=True parses each distinct date string once and broadcasts it
+                calendar_dates['date'] = pd.to_datetime(calendar_dates['date'], format='%Y%m%d', cache=True)
+                calendar_dates['day_of_week'] = calendar_dates['date'].dt.dayofweek.astype('int8')
             
             # Join with schedule on service_id
             schedule = schedule.merge(
@@ -199,17 +402,119 @@ class StaticGTFSLoader:
     
     def load_all(self, force_refresh: bool = False) -> pd.DataFrame:
         """
-        Convenience method to download, extract, and build master schedule.
+        Convenience method to download and build master schedule.
         
         Args:
-            force_refresh: If True, re-download GTFS data even if cached
+            force_refresh: If True, re-check the server for new GTFS data even if cached
             
         Returns:
             Master schedule DataFrame
         """
         self.download_gtfs_zip(force_refresh=force_refresh)
-        self.extract_gtfs_files()
-        return self.build_master_schedule()
+        
+        # Reuse the joined schedule while the ZIP is unchanged
+        zip_hash = self._hash_gtfs_zip()
+        if (PYARROW_AVAILABLE and self.master_parquet.exists() and self.stamp.exists()
+                and self.stamp.read_text().strip() == zip_hash):
+            schedule = pd.read_parquet(self.master_parquet)
+            print(f"Loaded cached master schedule with {len(schedule)} records")
+            return schedule
+        
+        # The loaders stream each file from the ZIP, so nothing is extracted
+        self._require_gtfs_files()
+        schedule = self.build_master_schedule()
+        
+        # The stamp only covers the ZIP: a schedule built without calendar dates
+        # (e.g. a failed API fetch) is not cached, so the next run retries
+        if PYARROW_AVAILABLE and 'day_of_week' not in schedule.columns:
+            print("Calendar dates unavailable; not caching the master schedule")
+        elif PYARROW_AVAILABLE:
+            schedule.to_parquet(self.master_parquet, engine='pyarrow', compression='snappy', index=False)
+            self._write_summaries(schedule)
+            self.stamp.write_text(zip_hash)
+            print(f"Cached master schedule to {self.master_parquet}")
+        
+        return schedule
+    
+    def build_schedule_summaries(self, schedule: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Pre-aggregate the master schedule by route and by route and hour.
+        
+        Args:
+            schedule: Master schedule DataFrame
+            
+        Returns:
+            Dictionary with 'by_route' (stop and trip counts per route) and
+            'stops_per_hour' (scheduled stop events per route and arrival hour)
+        """
+        # One row per scheduled stop event; the calendar join repeats them per service date
+        events = schedule.drop_duplicates(subset=['trip_id', 'stop_sequence'])
+        
+        by_route = events.groupby('route_id', observed=True).agg(
+            route_short_name=('route_short_name', 'first'),
+            route_long_name=('route_long_name', 'first'),
+            n_stops=('stop_id', 'nunique'),
+            n_trips=('trip_id', 'nunique')
+        ).reset_index()
+        
+        # GTFS hours run past 24 for after-midnight service and may have one
+        # digit ("7:05:00"), so derive them from seconds; blank times are skipped
+        if 'arrival_seconds' in events.columns:
+            seconds = events['arrival_seconds'].to_numpy()
+        else:
+            seconds = _gtfs_times_to_seconds(events['arrival_time'])
+        timed = events['arrival_time'].fillna('').str.strip().ne('').to_numpy()
+        stops_per_hour = (
+            events.assign(hour=(seconds // 3600).astype('int8'))[timed]
+            .groupby(['route_id', 'hour'], observed=True)
+            .size()
+            .rename('n_stop_events')
+            .reset_index()
+        )
+        
+        return {'by_route': by_route, 'stops_per_hour': stops_per_hour}
+    
+    def _write_summaries(self, schedule: pd.DataFrame):
+        """Persist the schedule summaries next to the master schedule cache."""
+        for name, summary in self.build_schedule_summaries(schedule).items():
+            summary.to_parquet(self.summary_paths[name], engine='pyarrow', compression='snappy', index=False)
+    
+    def _load_summary(self, name: str) -> pd.DataFrame:
+        """
+        Load a persisted schedule summary, building it from the master schedule if missing.
+        
+        Args:
+            name: 'by_route' or 'stops_per_hour'
+            
+        Returns:
+            Summary DataFrame as of the last load_all
+        """
+        if not PYARROW_AVAILABLE:
+            return self.build_schedule_summaries(self.load_all())[name]
+        if not self.summary_paths[name].exists():
+            self._write_summaries(self.load_all())
+        return pd.read_parquet(self.summary_paths[name])
+    
+    def load_by_route(self) -> pd.DataFrame:
+        """Load per-route stop and trip counts."""
+        return self._load_summary('by_route')
+    
+    def load_stops_per_hour(self) -> pd.DataFrame:
+        """Load scheduled stop events per route and arrival hour."""
+        return self._load_summary('stops_per_hour')
+    
+    def _hash_gtfs_zip(self) -> str:
+        """
+        Compute the SHA-256 of the cached GTFS ZIP.
+        
+        Returns:
+            Hex digest of the ZIP contents
+        """
+        digest = hashlib.sha256()
+        with open(self.gtfs_zip_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
 
 
 # Convenience function for quick access
@@ -218,7 +523,7 @@ def load_static_schedule(force_refresh: bool = False) -> pd.DataFrame:
     Load the complete static GTFS schedule with one function call.
     
     Args:
-        force_refresh: If True, re-download GTFS data
+        force_refresh: If True, re-check the server for new GTFS data
         
     Returns:
         Master schedule DataFrame
@@ -58,6 +58,8 @@ AWS_SECRET_ACCESS_KEY = get_config('AWS_SECRET_ACCESS_KEY') or get_config('aws.A
 AWS_DEFAULT_REGION = get_config('AWS_DEFAULT_REGION') or get_config('AWS_REGION') or get_config('aws.AWS_DEFAULT_REGION') or get_config('aws.AWS_REGION') or 'us-east-2'
 S3_BUCKET_NAME = get_config('S3_BUCKET_NAME', 'ets-transit-data') or get_config('aws.S3_BUCKET_NAME', 'ets-transit-data')
 DYNAMODB_TABLE_NAME = get_config('DYNAMODB_TABLE_NAME', 'ets_transit_processed') or get_config('aws.DYNAMODB_TABLE_NAME', 'ets_transit_processed')
+# GSI with record_type (hash) and sk (range); sk starts with the record's ISO timestamp
+DYNAMODB_RECORD_TYPE_INDEX = get_config('DYNAMODB_RECORD_TYPE_INDEX', 'record_type-sk-index')
 
 # GTFS Data Sources (public, no auth required)
 GTFS_RT_VEHICLE_POSITIONS_URL = get_config(
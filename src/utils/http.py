@@ -0,0 +1,17 @@
+"""
+Shared HTTP session for the schedule, calendar and weather API clients.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Keep-alive session: repeat calls reuse the TCP/TLS connection instead of
+# handshaking again; transient connection errors and 5xx responses are retried
+HTTP_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504))
+)
+HTTP_SESSION.mount('https://', _ADAPTER)
+HTTP_SESSION.mount('http://', _ADAPTER)
@@ -1,14 +1,20 @@
 """
 OpenWeatherMap API client for fetching weather data (P1 - Nice to Have feature).
 """
-import requests
+import time
 from typing import Optional, Dict
 from src.utils.config import OPENWEATHER_API_KEY, OPENWEATHER_LAT, OPENWEATHER_LON
+from src.utils.http import HTTP_SESSION
+
+# Current conditions change slowly, so a reading is reused for this long
+WEATHER_CACHE_TTL_SECONDS = 600
+_weather_cache = {'fetched_at': 0.0, 'data': None}
 
 
 def get_current_weather() -> Optional[Dict]:
     """
     Fetch current weather data for Edmonton from OpenWeatherMap API.
+    Successful readings are cached for WEATHER_CACHE_TTL_SECONDS.
     
     Returns:
         Dictionary with weather data including temperature, or None if API key not configured
@@ -16,6 +22,10 @@ def get_current_weather() -> Optional[Dict]:
     if not OPENWEATHER_API_KEY or OPENWEATHER_API_KEY == 'your_openweathermap_api_key':
         return None
     
+    # Coordinates are fixed, so a single cached reading serves every caller
+    if _weather_cache['data'] is not None and time.monotonic() - _weather_cache['fetched_at'] < WEATHER_CACHE_TTL_SECONDS:
+        return dict(_weather_cache['data'])
+    
     url = "https://api.openweathermap.org/data/2.5/weather"
     params = {
         'lat': OPENWEATHER_LAT,
@@ -25,17 +35,19 @@ def get_current_weather() -> Optional[Dict]:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = HTTP_SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
-        return {
+        weather = {
             'temperature': data['main']['temp'],
             'feels_like': data['main']['feels_like'],
             'humidity': data['main']['humidity'],
             'weather': data['weather'][0]['main'],
             'description': data['weather'][0]['description']
         }
+        _weather_cache.update(fetched_at=time.monotonic(), data=weather)
+        return dict(weather)
     except Exception as e:
         print(f"Warning: Could not fetch weather data: {e}")
         return None
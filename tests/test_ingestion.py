@@ -2,8 +2,12 @@
 Tests for data ingestion modules.
 """
 import pytest
+import numpy as np
+import pandas as pd
 from datetime import datetime
-from src.ingestion.data_quality import DataQualityValidator
+from types import SimpleNamespace
+from src.ingestion.data_quality import BoundedKeySet, DataQualityValidator
+from src.ingestion.dynamodb_writer import DynamoDBWriter
 
 
 def test_vehicle_position_validation():
@@ -74,5 +78,101 @@ def test_deduplication():
     assert validator.stats['vehicles_duplicate'] == 1
 
 
+def test_vectorized_vehicle_validation_matches_loop():
+    """Test vectorized vehicle validation against the per-record path."""
+    records = [
+        {'vehicle_id': '1', 'latitude': 53.5, 'longitude': -113.5, 'timestamp': '2024-01-01T10:00:00', 'speed': 5.0},
+        {'vehicle_id': '1', 'latitude': 53.5, 'longitude': -113.5, 'timestamp': '2024-01-01T10:00:00', 'speed': 5.0},  # Duplicate
+        {'vehicle_id': '2', 'latitude': None, 'longitude': -113.6, 'timestamp': '2024-01-01T10:01:00'},  # Missing latitude
+        {'vehicle_id': '3', 'latitude': 95.0, 'longitude': -113.6, 'timestamp': '2024-01-01T10:01:00'},  # Out of range
+        {'vehicle_id': '4', 'latitude': 53.6, 'longitude': -113.6, 'timestamp': '2024-01-01T10:01:00', 'speed': -1.0},  # Negative speed
+        {'vehicle_id': '5', 'latitude': 53.6, 'longitude': -113.6, 'timestamp': '2024-01-01T10:02:00', 'speed': None},
+    ]
+    
+    loop_validator = DataQualityValidator()
+    vec_validator = DataQualityValidator()
+    
+    assert vec_validator.validate_and_clean_vehicles_vec(records) == loop_validator.validate_and_clean_vehicles(records)
+    assert vec_validator.get_stats() == loop_validator.get_stats()
+    
+    # Records seen in an earlier batch are duplicates
+    assert vec_validator.validate_and_clean_vehicles_vec(records[:1]) == []
+    assert vec_validator.stats['vehicles_duplicate'] == 2
+
+
+def test_vectorized_trip_update_validation_matches_loop():
+    """Test vectorized trip update validation against the per-record path."""
+    records = [
+        {'trip_id': 't1', 'stop_id': 's1', 'feed_timestamp': '2024-01-01T10:00:00', 'delay': 60},
+        {'trip_id': 't1', 'stop_id': 's1', 'feed_timestamp': '2024-01-01T10:00:00', 'delay': 60},  # Duplicate
+        {'trip_id': 't1', 'stop_id': 's2', 'feed_timestamp': '2024-01-01T10:00:00'},
+        {'trip_id': None, 'stop_id': 's3', 'feed_timestamp': '2024-01-01T10:00:00'},  # Missing trip_id
+        {'trip_id': 't2', 'feed_timestamp': '2024-01-01T10:00:00'},  # Missing stop_id
+    ]
+    
+    loop_validator = DataQualityValidator()
+    vec_validator = DataQualityValidator()
+    
+    assert vec_validator.validate_and_clean_trip_updates_vec(records) == loop_validator.validate_and_clean_trip_updates(records)
+    assert vec_validator.get_stats() == loop_validator.get_stats()
+    
+    # Records seen in an earlier batch are duplicates
+    assert vec_validator.validate_and_clean_trip_updates_vec(records[:1]) == []
+    assert vec_validator.stats['trip_updates_duplicate'] == 2
+
+
+def test_bounded_key_set_evicts_oldest():
+    """Test that the dedup key set stays within its maximum size."""
+    seen = BoundedKeySet(maxsize=2)
+    seen.update([('1', 't0'), ('2', 't0'), ('3', 't0')])
+    
+    assert len(seen) == 2
+    assert ('1', 't0') not in seen
+    assert ('3', 't0') in seen
+
+
+
+def _capturing_writer():
+    """DynamoDBWriter whose batch writes and marker updates are recorded, not sent."""
+    sent, markers = [], []
+    
+    def batch_write_item(RequestItems):
+        for requests in RequestItems.values():
+            sent.extend(request['PutRequest']['Item'] for request in requests)
+        return {}
+    
+    writer = DynamoDBWriter.__new__(DynamoDBWriter)
+    writer.table_name = 'test'
+    writer.table = SimpleNamespace(meta=SimpleNamespace(client=SimpleNamespace(batch_write_item=batch_write_item)))
+    writer.update_latest_marker = lambda record_type, ts: markers.append(ts)
+    return writer, sent, markers
+
+
+def test_dataframe_vehicle_write_matches_dict_path():
+    """Test that batch_write_vehicles_df sends the same items as batch_write_vehicles."""
+    records = [
+        {'vehicle_id': '1', 'route_id': '8', 'latitude': 53.5, 'longitude': -113.5, 'speed': 5.0,
+         'timestamp': '2024-01-01T10:00:00'},
+        {'vehicle_id': '2', 'route_id': '9', 'latitude': 53.6, 'longitude': -113.6, 'speed': None,
+         'timestamp': '2024-01-01T10:00:30'},
+        {'vehicle_id': '3', 'route_id': None, 'latitude': 53.7, 'longitude': -113.7, 'speed': 2.5,
+         'timestamp': None},
+    ]
+    
+    dict_writer, dict_items, dict_markers = _capturing_writer()
+    dict_writer.batch_write_vehicles(records)
+    
+    # NaN speed, None route_id and NaT timestamp in a datetime64 column
+    df = pd.DataFrame(records).assign(timestamp=lambda d: pd.to_datetime(d['timestamp']))
+    assert df['speed'].isna().sum() == 1 and df['timestamp'].dtype.kind == 'M'
+    
+    df_writer, df_items, df_markers = _capturing_writer()
+    df_writer.batch_write_vehicles_df(df)
+    
+    assert df_items == dict_items
+    assert df_markers == dict_markers == ['2024-01-01T10:00:30']
+    assert 'speed' not in df_items[1]
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -5,6 +5,7 @@ import pytest
 import pandas as pd
 import numpy as np
 from src.ml.train_model import DelayPredictor
+from src.ml.quantize_model import QuantizedForestRegressor
 
 
 def test_data_preparation():
@@ -64,5 +65,30 @@ def test_model_training():
     assert all(isinstance(p, (int, float, np.number)) for p in predictions)
 
 
+def test_quantized_forest_matches_model():
+    """Test quantized forest predictions stay within the quantization bound."""
+    np.random.seed(42)
+    n_samples = 200
+    
+    data = pd.DataFrame({
+        'hour_of_day': np.random.randint(0, 24, n_samples),
+        'day_of_week': np.random.randint(0, 7, n_samples),
+        'route_id_encoded': np.random.randint(0, 10, n_samples),
+        'delay_minutes': np.random.normal(3, 2, n_samples)
+    })
+    
+    feature_cols = ['hour_of_day', 'day_of_week', 'route_id_encoded']
+    
+    predictor = DelayPredictor()
+    X_train, X_test, y_train, y_test = predictor.prepare_data(data, feature_cols)
+    predictor.train_random_forest(X_train, y_train, n_estimators=10)
+    
+    quantized = QuantizedForestRegressor(predictor.model)
+    
+    expected = predictor.model.predict(X_test)
+    predictions = quantized.predict(X_test)
+    assert np.abs(predictions - expected).max() <= quantized.max_error + 1e-9
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
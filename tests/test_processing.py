@@ -41,6 +41,32 @@ def test_delay_calculation():
     assert delays_df.iloc[0]['delay_minutes'] == 2.0
 
 
+def test_calculate_delay_mixed_timestamp_precision():
+    """Test trip updates whose feed timestamps mix whole and fractional seconds."""
+    calculator = DelayCalculator(pd.DataFrame({'trip_id': [], 'stop_id': [], 'arrival_time': []}))
+    
+    trip_updates = [
+        {'trip_id': 'trip1', 'stop_id': 'stop1', 'arrival_delay': 90, 'feed_timestamp': '2024-01-01T10:02:00'},
+        {'trip_id': 'trip2', 'stop_id': 'stop2', 'arrival_delay': None, 'feed_timestamp': '2024-01-01T10:02:30.250000'}
+    ]
+    
+    delays_df = calculator.calculate_delay_from_trip_updates(trip_updates)
+    
+    assert delays_df['delay_minutes'].tolist() == [1.5, 0.0]
+    assert delays_df['feed_timestamp'].iloc[1] == pd.Timestamp('2024-01-01 10:02:30.250')
+
+
+def test_times_to_seconds_matches_scalar():
+    """Test vectorized schedule time conversion against the per-value parser."""
+    times = pd.Series(['10:00:00', '25:30:15', None, 'bad', '10:00:00', '08:05:00'])
+    calculator = DelayCalculator(pd.DataFrame({'arrival_time': times}))
+    
+    expected = [calculator._time_to_seconds(t) for t in times]
+    
+    assert calculator.static_schedule['arrival_seconds'].tolist() == expected
+    assert expected == [36000, 91815, 0, 0, 36000, 29100]
+
+
 def test_feature_engineering():
     """Test feature engineering."""
     # Sample data